@@ -9,10 +9,20 @@ and get context-aware answers.
 Main Features:
 --------------
 - Upload up to 10 files (.pdf, .txt, .json, .xml, .xlsx)
-- Handles file parsing, chunking, vector indexing, and retrieval
+- Handles file parsing, chunking, vector indexing, and retrieval (via utils/pipeline.py,
+  which also runs headless: python -m utils.pipeline questions.jsonl --data-dir data/)
+- For many concurrent users, serve the same pipeline over HTTP instead: uvicorn server:app
+- Over-fetches candidates and lets a cross-encoder keep the best 5 (utils/reranker.py), so the
+  prompt stays short; set RAG_RERANK=0 to send the top 10 retrieval hits instead
 - Uses Groq’s LLM to generate answers with Chain-of-Thought prompting
-- Detects filename-specific questions like “what does revenue.xlsx say?”
+- Routes each question once (utils/query_router.py): filename questions like “what does
+  revenue.xlsx say?” skip vector search, filenames / months / years narrow the search
 - Built-in evaluation module with ROUGE, cosine similarity, F1, and accuracy scoring
+- Fast cold start: heavy modules and models load on first use, warmed up in the background
+  while you upload (utils/warmup.py); evaluation dependencies load only on "Evaluate Model".
+  `python -m benchmarks.import_times` measures what each import costs.
+- Optional debug panel (sidebar) with per-stage timings; set RAG_METRICS_PORT to also serve
+  them at http://127.0.0.1:<port>/metrics (Prometheus) and /spans (JSON)
 
 Bonus Perks:
 ------------
@@ -28,19 +38,22 @@ Usage:
 """
 
 
+import os
 import streamlit as st
-from utils.file_loader import load_files
-from utils.chunker import chunk_sections
-from utils.faiss_handler import build_faiss_index, get_top_chunks
-from utils.retriever import generate_response
-from prompts.chain_of_thought import cot_prompt
-from utils.evaluation import evaluate_predictions
-import pandas as pd
-import re
+from utils.pipeline import RAGPipeline
+from utils.retriever import stream_response
+from utils.tracing import recent_spans, start_metrics_server, summary
+from utils.warmup import start_warmup, warmup_status
 
 
 st.set_page_config(page_title="RAG App", layout="wide")
 
+if os.getenv("RAG_METRICS_PORT"):
+    start_metrics_server(int(os.getenv("RAG_METRICS_PORT")))
+
+# Models and heavy modules load in the background while the user picks files (utils/warmup.py)
+start_warmup()
+
 st.markdown("""
     <style>
     .block-container {
@@ -78,65 +91,34 @@ query = st.text_input("Ask a question to your knowledge base:")
 
 if uploaded_files and query:
     with st.spinner("Processing..."):
-
-        # STEP 1: Load file content
-        documents = load_files(uploaded_files)
-
-        # STEP 2: Detect filename-based queries
-        filename_question_match = re.search(r"what does (.*?) say", query.lower())
-        if filename_question_match:
-            keyword = filename_question_match.group(1).strip().replace(" ", "").lower()
-
-            matched_docs = [
-                doc for doc in documents
-                if keyword in doc["filename"].lower().replace(" ", "")
-            ]
-
-            if matched_docs:
-                st.markdown(f"📄 Found content from **{matched_docs[0]['filename']}**")
-                st.write(matched_docs[0]['content'][:2000])
-
-                final_prompt = f"""Use the following document content to answer the question:
-
-                Content from {matched_docs[0]['filename']}:
-                {matched_docs[0]['content'][:3000]}
-
-                Question: {query}
-                Answer:"""
-                
-                answer = generate_response(final_prompt)
-
-                st.markdown("### 💬 Answer")
-                st.write(answer)
-            else:
-                st.warning(f"No document found matching **{keyword}**")
+        # Load, chunk and index — served from the on-disk cache when nothing changed.
+        # Everything up to the LLM call lives in RAGPipeline (utils/pipeline.py); the app only renders.
+        pipeline = RAGPipeline()
+        pipeline.ingest(uploaded_files)
+        result = pipeline.prepare(query)
+
+        if result["route"] == "file_missing":
+            st.warning(f"No document found matching **{result['keyword']}**")
+
+        elif result["route"] == "file":
+            # Filename lookups go straight to the metadata index — no embedding, no vector search
+            st.markdown(f"📄 Found content from **{result['filename']}**")
+            st.write(result["content"][:2000])
+            st.markdown("### 💬 Answer")
+            pipeline.record_answer(result, st.write_stream(stream_response(result["prompt"])))
 
         else:
-            # STEP 3: Chunking logic
-            # Determine whether to apply regex chunking (for .txt and .pdf only)
-            structured_types = {"json", "xml", "xlsx"}
-            if any(doc.get("type") in structured_types for doc in documents):
-                chunks = documents 
-            else:
-                chunks = chunk_sections(documents)
-
-            
-            # STEP 4: Build FAISS index
-            index, chunk_texts = build_faiss_index(chunks)
-
-            # STEP 5: Retrieve top chunks
-            relevant_chunks = get_top_chunks(index, chunk_texts, query, top_k=10)
-
-            # STEP 6: Generate prompt with Chain-of-Thought
-            final_prompt = cot_prompt(query, relevant_chunks)
-            answer = generate_response(final_prompt)
-
             st.markdown("### 💬 Answer")
-            st.write(answer)
+            if result["route"] == "cache":
+                # Near-identical question already answered against this exact corpus
+                st.caption(f"♻️ Reused answer to a similar question: “{result['cached_query']}”")
+                st.write(result["answer"])
+            else:
+                pipeline.record_answer(result, st.write_stream(stream_response(result["prompt"])))
 
             #  Show retrieved chunk sources before generating answer
             st.markdown("### 📄 Top Chunks Used")
-            for idx, chunk in enumerate(relevant_chunks, 1):
+            for idx, chunk in enumerate(result["chunks"], 1):
                     filename = chunk.get("filename", "Unknown")
                     st.markdown(f"**Chunk {idx}: {filename}**")
                     st.code(chunk.get("content", "")[:1000])
@@ -163,16 +145,20 @@ if not uploaded_files:
     st.warning("⚠️ Please upload a file first — evaluation uses retrieved chunks.")
 
 elif st.button("Evaluate Model"):
-    with st.spinner("Running evaluation with live model answers..."):
-        model_answers = {}
+    # Evaluation dependencies (rouge_score, pandas tables) load only once someone asks for them
+    import pandas as pd
+    from utils.evaluation import evaluate_predictions_detailed
 
-        for question in ground_truth_data:
-            relevant_chunks = get_top_chunks(index, chunk_texts, question, top_k=5)
-            prompt = cot_prompt(question, relevant_chunks)
-            answer = generate_response(prompt).strip()
-            model_answers[question] = answer
+    with st.spinner("Running evaluation with live model answers..."):
+        # Live answers, never cached ones: the cache would hide how retrieval actually does
+        pipeline = RAGPipeline(top_k=5, use_cache=False)
+        pipeline.ingest(uploaded_files)
+        questions = list(ground_truth_data)
+        answers = pipeline.query_many(questions)
+        model_answers = {result["query"]: result["answer"].strip() for result in answers}
 
-        results = evaluate_predictions(ground_truth_data, model_answers)
+        evaluation = evaluate_predictions_detailed(ground_truth_data, model_answers)
+        results = evaluation["aggregate"]
 
     st.success("✅ Evaluation complete!")
 
@@ -180,6 +166,10 @@ elif st.button("Evaluate Model"):
     df = pd.DataFrame(metric_pairs, columns=["Metric", "Score"])
     st.markdown("### 📊 Evaluation Metrics")
     st.table(df)
+
+    with st.expander("Per-question scores"):
+        st.dataframe(pd.DataFrame(evaluation["per_question"]))
+
     explanation_map = {
     "ROUGE-1": (
         "Measures the overlap of **unigrams** (individual words) between the model’s answer and the expected answer.\n\n"
@@ -235,3 +225,24 @@ elif st.button("Evaluate Model"):
         st.markdown(f"**Your score:** `{score:.2f}` – Quality: **{level}**")
         st.markdown(explanation)
 
+
+# -------------------
+# Debug Panel
+# -------------------
+# Rendered last so it includes the spans from this run
+
+with st.sidebar:
+    if st.checkbox("🔍 Show pipeline timings"):
+        import pandas as pd
+
+        warmup = [f"{name} {state}s" if isinstance(state, float) else f"{name} {state}"
+                  for name, state in warmup_status().items()]
+        st.caption("Warm-up: " + ", ".join(warmup))
+        stages = summary()
+        if stages:
+            st.markdown("### ⏱️ Per-stage totals")
+            st.dataframe(pd.DataFrame.from_dict(stages, orient="index"))
+            st.markdown("### 🧵 Recent spans")
+            st.dataframe(pd.DataFrame(recent_spans(50)[::-1]))
+        else:
+            st.caption("Nothing traced yet — ask a question first.")
@@ -0,0 +1,95 @@
+"""
+HOW FAST (AND HOW RIGHT) IS EACH INDEX TYPE?
+--------------------------------------------
+
+Recall/latency benchmark for the ANN index types in utils/index_manager.py, on synthetic
+clustered embeddings (MiniLM-sized by default), from demo scale up to millions of chunks.
+
+For every corpus size and index type it reports:
+- build_s:   training + adding all vectors
+- recall@k:  overlap with exact (flat) search results
+- qps:       queries per second for a batch search
+- memory_mb: serialized index size
+
+Usage:
+------
+    python -m benchmarks.ann_benchmark --sizes 10000 100000 1000000 --nprobe 16 --ef-search 64
+    python -m benchmarks.ann_benchmark --sizes 10000 --out ann_results.json
+"""
+
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from utils.index_manager import INDEX_TYPES, make_faiss_index, normalize, set_search_params
+
+
+def synthetic_corpus(n, dim, n_queries, n_clusters=256, seed=0):
+    # Gaussian blobs look more like real embeddings than uniform noise does
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    assignment = rng.integers(n_clusters, size=n + n_queries)
+    points = centers[assignment] + 0.5 * rng.normal(size=(n + n_queries, dim)).astype(np.float32)
+    points = normalize(points)
+    return points[:n], points[n:]
+
+
+def run(sizes, dim, k, n_queries, types, nprobe, ef_search):
+    results = []
+    for n in sizes:
+        corpus, queries = synthetic_corpus(n, dim, n_queries)
+        ids = np.arange(n, dtype=np.int64)
+        truth = None
+
+        for kind in ["flat"] + [t for t in types if t != "flat"]:
+            start = time.perf_counter()
+            index = make_faiss_index(kind, dim, corpus if kind in ("ivf", "ivfpq") else None)
+            index.add_with_ids(corpus, ids)
+            build_s = time.perf_counter() - start
+            set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+
+            start = time.perf_counter()
+            _, found = index.search(queries, k)
+            search_s = time.perf_counter() - start
+
+            if truth is None:
+                truth = found
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+            row = {
+                "n": n,
+                "type": kind,
+                "build_s": round(build_s, 3),
+                f"recall@{k}": round(float(recall), 4),
+                "qps": round(n_queries / search_s, 1),
+                "memory_mb": round(faiss.serialize_index(index).nbytes / 2**20, 2),
+            }
+            results.append(row)
+            print(json.dumps(row))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--out", help="Write all rows to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dim, args.k, args.queries, args.types, args.nprobe, args.ef_search)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+WHERE DO BENCHMARK DOCUMENTS COME FROM?
+---------------------------------------
+
+Synthetic, seeded corpora in every format the loader supports (.txt, .json, .xml, .xlsx, .pdf),
+sized by how much text they carry — so "medium" means roughly the same amount of content
+whichever format it is wrapped in, and the same seed always gives byte-identical files.
+
+Text is made of random business-y sentences with years, names and numbers mixed in, different
+enough from each other that dedup (utils/dedup.py) doesn't collapse them.
+
+Functions:
+----------
+- make_file(fmt, text_bytes, seed=0): One in-memory upload (BytesIO with a .name).
+- make_corpus(text_bytes, formats=FORMATS, seed=0): One file per format.
+- make_questions(n, seed=0): Questions in the same vocabulary, for retrieval benchmarks.
+"""
+
+
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import fitz
+import numpy as np
+import openpyxl
+
+
+FORMATS = ("txt", "json", "xml", "xlsx", "pdf")
+SCALES = {"small": 200_000, "medium": 2_000_000, "large": 20_000_000}  # bytes of text per file
+
+SUBJECTS = ["Flipkart", "Myntra", "PhonePe", "Ekart", "Cleartrip", "Walmart", "Amazon", "Jabong",
+            "Shopsy", "Flipkart Health", "Flipkart Wholesale", "SuperCoin", "Big Billion Days"]
+VERBS = ["acquired", "launched", "expanded", "invested in", "partnered with", "reported", "raised",
+         "restructured", "opened", "announced", "integrated", "scaled", "discontinued", "piloted"]
+OBJECTS = ["a logistics network", "a fashion platform", "a payments app", "a grocery service",
+           "warehouses in Bangalore", "a seller program", "an ad business", "quick commerce",
+           "a travel portal", "a fintech arm", "private labels", "a video platform", "a loyalty scheme"]
+EXTRAS = ["across tier-2 cities", "after a funding round", "amid regulatory scrutiny",
+          "to compete on price", "with strong festive demand", "despite falling margins",
+          "in a joint venture", "as part of an IPO plan", "following leadership changes"]
+
+
+class MemoryFile(io.BytesIO):
+    """Bytes shaped like a Streamlit upload (.name + getvalue), like file_loader.LocalFile."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def sentences(rng, n):
+    subjects = rng.choice(SUBJECTS, n)
+    verbs = rng.choice(VERBS, n)
+    objects = rng.choice(OBJECTS, n)
+    extras = rng.choice(EXTRAS, n)
+    years = rng.integers(2007, 2026, n)
+    amounts = rng.integers(1, 5000, n)
+    return [
+        f"In {year}, {subject} {verb} {obj} {extra}, worth ${amount} million (ref {rng_id:06d})."
+        for subject, verb, obj, extra, year, amount, rng_id
+        in zip(subjects, verbs, objects, extras, years, amounts, rng.integers(0, 10**6, n))
+    ]
+
+
+def _paragraphs(rng, text_bytes, per_paragraph=6):
+    # ~110 bytes per sentence
+    n = max(per_paragraph, text_bytes // 110)
+    lines = sentences(rng, n)
+    return [" ".join(lines[i:i + per_paragraph]) for i in range(0, n, per_paragraph)]
+
+
+def _txt(rng, text_bytes):
+    parts = []
+    for i, paragraph in enumerate(_paragraphs(rng, text_bytes)):
+        if i % 4 == 0:
+            parts.append(f"## Section {i // 4 + 1}")
+        parts.append(paragraph)
+    return "\n".join(parts).encode("utf-8")
+
+
+def _json(rng, text_bytes):
+    records = [
+        {"id": i, "title": f"Record {i}", "year": int(2007 + i % 19), "body": paragraph}
+        for i, paragraph in enumerate(_paragraphs(rng, text_bytes, per_paragraph=3))
+    ]
+    return json.dumps(records).encode("utf-8")
+
+
+def _xml(rng, text_bytes):
+    root = ET.Element("records")
+    for i, paragraph in enumerate(_paragraphs(rng, text_bytes, per_paragraph=3)):
+        record = ET.SubElement(root, "record", id=str(i))
+        ET.SubElement(record, "title").text = f"Record {i}"
+        ET.SubElement(record, "body").text = paragraph
+    return ET.tostring(root, encoding="utf-8")
+
+
+def _xlsx(rng, text_bytes):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append(["Company", "Event", "Year", "Value"])
+    for line in sentences(rng, max(1, text_bytes // 110)):
+        sheet.append([str(rng.choice(SUBJECTS)), line, int(rng.integers(2007, 2026)), float(rng.random())])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def _pdf(rng, text_bytes, page_bytes=2500):
+    doc = fitz.open()
+    text, page_text = _paragraphs(rng, text_bytes), []
+    for paragraph in text + [None]:
+        if paragraph is not None and sum(map(len, page_text)) + len(paragraph) < page_bytes:
+            page_text.append(paragraph)
+            continue
+        if page_text:
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 576, 806), "\n\n".join(page_text), fontsize=7)
+        page_text = [paragraph] if paragraph is not None else []
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+WRITERS = {"txt": _txt, "json": _json, "xml": _xml, "xlsx": _xlsx, "pdf": _pdf}
+
+
+def make_file(fmt, text_bytes, seed=0):
+    rng = np.random.default_rng([seed, FORMATS.index(fmt), text_bytes])
+    return MemoryFile(f"synthetic_{text_bytes}.{fmt}", WRITERS[fmt](rng, text_bytes))
+
+
+def make_corpus(text_bytes, formats=FORMATS, seed=0):
+    return [make_file(fmt, text_bytes, seed) for fmt in formats]
+
+
+def make_questions(n, seed=0):
+    rng = np.random.default_rng([seed, 99])
+    templates = ["What did {s} do in {y}?", "When did {s} open {o}?", "Who {v} {o}?",
+                 "How much was {s} worth in {y}?", "Why did {s} get {o} {e}?"]
+    return [
+        str(rng.choice(templates)).format(
+            s=rng.choice(SUBJECTS), y=int(rng.integers(2007, 2026)), o=rng.choice(OBJECTS),
+            v=rng.choice(VERBS), e=rng.choice(EXTRAS),
+        )
+        for _ in range(n)
+    ]
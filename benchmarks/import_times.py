@@ -0,0 +1,124 @@
+"""
+HOW LONG BEFORE THE FIRST PAGE PAINTS?
+--------------------------------------
+
+Measured import times, each in a fresh interpreter (so nothing is already cached):
+
+- app.py's top-level imports — what Streamlit runs before it can draw anything — and which
+  heavy dependencies they drag in eagerly (the goal is: none of them).
+- Every heavy dependency on its own, plus the main utils entry points, so you can see what
+  lazy loading is saving and what first use will still cost.
+
+Each row is the median wall time of --repeat runs; the slowest modules by self time
+(python -X importtime) are listed for the app row, to show where the rest goes.
+
+Usage:
+------
+    python -m benchmarks.import_times
+    python -m benchmarks.import_times --repeat 5 --top 15 --out imports.json
+"""
+
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["torch", "sentence_transformers", "transformers", "langchain", "faiss", "rouge_score", "nltk",
+         "sklearn", "scipy", "pandas", "fitz", "openpyxl"]
+MODULES = ["utils.pipeline", "utils.evaluation", "server"] + [
+    "sentence_transformers", "transformers", "torch", "langchain.schema", "faiss", "rouge_score.rouge_scorer",
+    "scipy.sparse", "pandas", "fitz", "openpyxl", "streamlit", "fastapi",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def app_imports(path=os.path.join(ROOT, "app.py")):
+    """Modules app.py imports at top level (not the ones it imports lazily inside branches)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _self_times(stderr, top):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return [{"module": name, "self_ms": round(us / 1000, 1), "cumulative_ms": round(cum / 1000, 1)}
+            for us, cum, name in rows[:top]]
+
+
+def measure(modules, repeat=3, top=0):
+    code = PROBE.format(imports="\n".join(f"import {module}" for module in modules), heavy=HEAVY)
+    times, loaded, slowest = [], [], []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                              capture_output=True, text=True)
+        if proc.returncode:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            return {"error": error}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded = result["loaded"]
+        if top:
+            slowest = _self_times(proc.stderr, top)
+    return {"seconds": round(statistics.median(times), 3), "eager_heavy": loaded, "slowest": slowest}
+
+
+def run(repeat, top):
+    report = {"app.py": dict(measure(app_imports(), repeat, top), modules=app_imports())}
+    for module in MODULES:
+        report[module] = measure([module], repeat)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list for app.py")
+    parser.add_argument("--out", help="Also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.top)
+    for name, result in report.items():
+        if "error" in result:
+            print(f"{name:28s} {'-':>8s}  {result['error']}")
+            continue
+        eager = ", ".join(result["eager_heavy"]) or "none"
+        print(f"{name:28s} {result['seconds']:>7.3f}s  heavy deps loaded: {eager}")
+
+    app = report["app.py"]
+    if app.get("slowest"):
+        print("\nSlowest imports under app.py (self time):")
+        for row in app["slowest"]:
+            print(f"  {row['module']:45s} {row['self_ms']:>8.1f} ms  (cumulative {row['cumulative_ms']:.1f} ms)")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+A FAKE GROQ FOR BENCHMARKS
+--------------------------
+
+A local OpenAI-compatible /chat/completions server with a fixed, configurable latency, so
+benchmarks and load tests measure our code instead of Groq's queue (and cost nothing).
+Supports blocking and streamed (SSE) responses and reports usage.prompt_tokens like Groq does.
+It can also answer the first `throttle` requests with 429 (to exercise retries), and counts
+requests and the most it ever had in flight at once (stub.stats) to check concurrency caps.
+
+Usage:
+------
+    # standalone, for the app or the pipeline CLI
+    python -m benchmarks.stub_llm --port 8765 --latency 0.2
+    GROQ_API_URL=http://127.0.0.1:8765/v1/chat/completions streamlit run app.py
+
+    # in-process
+    with StubLLMServer(latency=0.05) as url:
+        os.environ["GROQ_API_URL"] = url
+"""
+
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ANSWER = "Flipkart was founded in October 2007 by Sachin Bansal and Binny Bansal in Bangalore."
+
+
+def _handler(latency, ttft, answer, throttle, stats):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                stats["requests"] += 1
+                throttled = stats["requests"] <= throttle
+                if throttled:
+                    stats["throttled"] += 1
+                else:
+                    stats["in_flight"] += 1
+                    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            if throttled:
+                self.send_response(429)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                self._answer(body)
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def _answer(self, body):
+            prompt = " ".join(message.get("content", "") for message in body.get("messages", []))
+            usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(answer.split())}
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                time.sleep(ttft)
+                words = answer.split(" ")
+                for i, word in enumerate(words):
+                    event = {"choices": [{"delta": {"content": word + (" " if i < len(words) - 1 else "")}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(max(latency - ttft, 0) / len(words))
+                final = {"choices": [{"delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.close_connection = True
+                return
+
+            time.sleep(latency)
+            payload = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+class StubLLMServer:
+    def __init__(self, port=0, latency=0.05, ttft=0.01, answer=ANSWER, host="127.0.0.1", throttle=0):
+        self.stats = {"requests": 0, "throttled": 0, "in_flight": 0, "peak_in_flight": 0}
+        self.server = ThreadingHTTPServer((host, port), _handler(latency, ttft, answer, throttle, self.stats))
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/v1/chat/completions"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-llm", daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds to the first streamed token")
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.port, args.latency, args.ttft)
+    print(f"Stub LLM listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+ARE THE HOT PATHS GETTING SLOWER?
+---------------------------------
+
+Reproducible throughput/latency benchmarks for the whole pipeline, on seeded synthetic corpora
+(benchmarks/corpus.py) at several scales, with Groq replaced by a local stub server
+(benchmarks/stub_llm.py). Results go to a JSON file that later runs can be compared against.
+
+What gets measured (per scale):
+-------------------------------
+- load_files.<fmt>     MB/s and documents/s, for each of txt/json/xml/xlsx/pdf
+- chunk_sections       MB/s and chunks/s over the loaded documents
+- build_faiss_index    chunks/s (embedding cache cleared first, so every chunk is encoded)
+- get_top_chunks       p50/p99 latency per query (ms), plus batched queries/s
+- embed_query          single-query embeddings/s from EMBED_THREADS concurrent callers, straight
+                       to the model vs through the micro-batching service (utils/embedding_service.py)
+- cot_prompt           prompt size (chars and tokens) and p50 build time
+- evaluate_predictions items/s
+- pipeline             end-to-end questions/s through RAGPipeline.query_many against the stub
+
+Every number is the median of --repeat runs. Each row records which direction is better, so
+--compare can flag regressions beyond --tolerance (relative) and exit non-zero.
+
+Usage:
+------
+    python -m benchmarks.suite --scales small medium --out bench.json
+    python -m benchmarks.suite --scales small --compare bench.json --tolerance 0.2
+    python -m benchmarks.suite --only load_files chunk_sections --scales large
+
+Numbers depend on the machine and the embedding model: compare runs from the same box.
+"""
+
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The stub answers in milliseconds; don't let the Groq rate limiter be what we measure
+os.environ.setdefault("GROQ_REQUESTS_PER_SECOND", "1000")
+os.environ.setdefault("GROQ_MAX_CONCURRENCY", "16")
+
+import numpy as np
+
+from benchmarks.corpus import FORMATS, SCALES, make_corpus, make_file, make_questions, sentences
+from benchmarks.stub_llm import StubLLMServer
+from prompts.chain_of_thought import cot_prompt
+from utils import retriever
+from utils.chunker import chunk_sections
+from utils.dedup import clear_embedding_cache
+from utils.embedding_service import embed_one, get_service
+from utils.embeddings import EMBEDDING_MODEL, embed_query, get_model
+from utils.evaluation import evaluate_predictions
+from utils.faiss_handler import build_faiss_index, get_top_chunks, get_top_chunks_batch
+from utils.file_loader import load_files
+from utils.index_manager import INDEX_TYPE
+from utils.pipeline import RAGPipeline
+from utils.tokenizer import count_tokens
+
+
+EVAL_ITEMS = {"small": 200, "medium": 2000, "large": 20000}
+QUERIES = 100
+PIPELINE_QUESTIONS = 50
+STUB_LATENCY = 0.05
+EMBED_THREADS = 16
+
+
+def row(name, scale, metric, value, unit, better):
+    return {"name": name, "scale": scale, "metric": metric, "value": round(float(value), 4),
+            "unit": unit, "better": better}
+
+
+def timed(func, repeat):
+    """Median wall time of repeat calls, and the last call's result."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(np.asarray(samples) * 1000, q))
+
+
+def bench_load_files(scale, size, repeat, state):
+    rows = []
+    for fmt in FORMATS:
+        file = make_file(fmt, size)
+        n_bytes = len(file.getvalue())
+        seconds, docs = timed(lambda: load_files([file]), repeat)
+        rows.append(row(f"load_files.{fmt}", scale, "mb_per_s", n_bytes / 2**20 / seconds, "MB/s", "higher"))
+        rows.append(row(f"load_files.{fmt}", scale, "docs_per_s", len(docs) / seconds, "docs/s", "higher"))
+    return rows
+
+
+def bench_chunk_sections(scale, size, repeat, state):
+    documents = state.setdefault("documents", load_files(make_corpus(size)))
+    n_bytes = sum(len(doc["content"].encode("utf-8")) for doc in documents)
+    seconds, chunks = timed(lambda: chunk_sections(documents), repeat)
+    state["chunks"] = chunks
+    return [
+        row("chunk_sections", scale, "mb_per_s", n_bytes / 2**20 / seconds, "MB/s", "higher"),
+        row("chunk_sections", scale, "chunks_per_s", len(chunks) / seconds, "chunks/s", "higher"),
+    ]
+
+
+def _chunks(state, size):
+    if "chunks" not in state:
+        state["chunks"] = chunk_sections(state.setdefault("documents", load_files(make_corpus(size))))
+    return state["chunks"]
+
+
+def bench_build_faiss_index(scale, size, repeat, state):
+    chunks = _chunks(state, size)
+    get_model()  # model load is a one-off, not part of indexing throughput
+
+    def build():
+        clear_embedding_cache()
+        return build_faiss_index(chunks)
+
+    seconds, (index, _) = timed(build, repeat)
+    state["index"] = index
+    return [
+        row("build_faiss_index", scale, "chunks_per_s", len(chunks) / seconds, "chunks/s", "higher"),
+        row("build_faiss_index", scale, "vectors", len(index), "vectors", "lower"),
+    ]
+
+
+def _index(state, size):
+    if "index" not in state:
+        clear_embedding_cache()
+        state["index"], _ = build_faiss_index(_chunks(state, size))
+    return state["index"]
+
+
+def bench_get_top_chunks(scale, size, repeat, state):
+    index = _index(state, size)
+    queries = make_questions(QUERIES)
+    for query in queries[:5]:
+        get_top_chunks(index, None, query, top_k=10)  # warm-up
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            get_top_chunks(index, None, query, top_k=10)
+            latencies.append(time.perf_counter() - start)
+    seconds, _ = timed(lambda: get_top_chunks_batch(index, queries, k=10), repeat)
+    return [
+        row("get_top_chunks", scale, "p50_ms", percentile_ms(latencies, 50), "ms", "lower"),
+        row("get_top_chunks", scale, "p99_ms", percentile_ms(latencies, 99), "ms", "lower"),
+        row("get_top_chunks_batch", scale, "queries_per_s", len(queries) / seconds, "queries/s", "higher"),
+    ]
+
+
+def bench_embed_query(scale, size, repeat, state):
+    queries = make_questions(QUERIES * 4, seed=2)
+    get_model()
+    get_service()
+
+    def concurrent(embed):
+        with ThreadPoolExecutor(max_workers=EMBED_THREADS) as pool:
+            return list(pool.map(embed, queries))
+
+    direct, _ = timed(lambda: concurrent(embed_query), repeat)
+    batched, _ = timed(lambda: concurrent(embed_one), repeat)
+    return [
+        row("embed_query.direct", scale, "queries_per_s", len(queries) / direct, "queries/s", "higher"),
+        row("embed_query.batched", scale, "queries_per_s", len(queries) / batched, "queries/s", "higher"),
+    ]
+
+
+def bench_cot_prompt(scale, size, repeat, state):
+    index = _index(state, size)
+    questions = make_questions(QUERIES)
+    retrieved = get_top_chunks_batch(index, questions, k=10)
+
+    latencies, chars = [], []
+    for _ in range(repeat):
+        for question, chunks in zip(questions, retrieved):
+            start = time.perf_counter()
+            prompt = cot_prompt(question, chunks)
+            latencies.append(time.perf_counter() - start)
+            chars.append(len(prompt))
+    tokens = [count_tokens(cot_prompt(question, chunks)) for question, chunks in zip(questions[:20], retrieved)]
+    return [
+        row("cot_prompt", scale, "p50_ms", percentile_ms(latencies, 50), "ms", "lower"),
+        row("cot_prompt", scale, "mean_chars", np.mean(chars), "chars", "lower"),
+        row("cot_prompt", scale, "mean_tokens", np.mean(tokens), "tokens", "lower"),
+    ]
+
+
+def bench_evaluate_predictions(scale, size, repeat, state):
+    rng = np.random.default_rng(7)
+    n = EVAL_ITEMS[scale]
+    refs = sentences(rng, n)
+    preds = [ref if i % 3 else sentence for i, (ref, sentence) in enumerate(zip(refs, sentences(rng, n)))]
+    ground_truth = {f"q{i}": ref for i, ref in enumerate(refs)}
+    predictions = {f"q{i}": pred for i, pred in enumerate(preds)}
+    get_model()
+    seconds, _ = timed(lambda: evaluate_predictions(ground_truth, predictions), repeat)
+    return [row("evaluate_predictions", scale, "items_per_s", n / seconds, "items/s", "higher")]
+
+
+def bench_pipeline(scale, size, repeat, state):
+    questions = make_questions(PIPELINE_QUESTIONS, seed=1)
+    with StubLLMServer(latency=STUB_LATENCY) as url, tempfile.TemporaryDirectory() as index_dir:
+        original_url, retriever.GROQ_API_URL = retriever.GROQ_API_URL, url
+        try:
+            pipeline = RAGPipeline(index_dir, use_cache=False)
+            ingest_seconds, _ = timed(lambda: pipeline.ingest(make_corpus(size)), 1)
+            seconds, results = timed(lambda: pipeline.query_many(questions), repeat)
+        finally:
+            retriever.GROQ_API_URL = original_url
+    failed = sum(result["answer"].strip().startswith("Error") for result in results)
+    if failed:
+        print(f"pipeline[{scale}]: {failed} stub calls failed", file=sys.stderr)
+    return [
+        row("pipeline", scale, "ingest_s", ingest_seconds, "s", "lower"),
+        row("pipeline", scale, "questions_per_s", len(questions) / seconds, "questions/s", "higher"),
+    ]
+
+
+BENCHMARKS = {
+    "load_files": bench_load_files,
+    "chunk_sections": bench_chunk_sections,
+    "build_faiss_index": bench_build_faiss_index,
+    "get_top_chunks": bench_get_top_chunks,
+    "embed_query": bench_embed_query,
+    "cot_prompt": bench_cot_prompt,
+    "evaluate_predictions": bench_evaluate_predictions,
+    "pipeline": bench_pipeline,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, only, repeat):
+    results = []
+    for scale in scales:
+        state = {}  # documents / chunks / index shared between benchmarks of one scale
+        for name, bench in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            for result in bench(scale, SCALES[scale], repeat, state):
+                results.append(result)
+                print(f"{result['name']}[{scale}] {result['metric']}: {result['value']} {result['unit']}",
+                      file=sys.stderr)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "embedding_model": EMBEDDING_MODEL,
+            "index_type": INDEX_TYPE,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _key(result):
+    return f"{result['name']}[{result['scale']}].{result['metric']}"
+
+
+def compare(current, baseline, tolerance):
+    """Prints current vs baseline for every shared metric; returns the keys that regressed."""
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(_key(result))
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / abs(before["value"])
+        worse = -change if result["better"] == "higher" else change
+        flag = ""
+        if worse > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(_key(result))
+        print(f"{_key(result):55s} {before['value']:>12.4f} -> {result['value']:>12.4f} {result['unit']:12s} "
+              f"{change:+.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["small"], choices=list(SCALES))
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run just these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write results JSON here (use it as the next --compare baseline)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    current = run(args.scales, args.only, args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,75 @@
-def cot_prompt(query, chunks):
+"""
+WHAT'S COOKING IN HERE?
+-----------------------
+The Chain-of-Thought prompt builder.
+
+- pack_context(chunks, max_tokens): Emits each retrieved chunk once, labelled with its source,
+  in relevance order — skipping near-duplicate chunks and stopping at a real token budget.
+- cot_prompt(query, chunks): Wraps the packed context in step-by-step reasoning instructions
+  and worked examples.
+"""
+
+
+import os
+import re
+
+from utils.tokenizer import count_tokens, truncate_to_tokens
+from utils.tracing import annotate, span
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "3000"))
+MIN_PARTIAL_TOKENS = 64     # don't bother squeezing in a chunk tail shorter than this
+DUPLICATE_OVERLAP = 0.8     # share of the smaller chunk's shingles already in the context
+SHINGLE_SIZE = 5
+
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _is_duplicate(shingles, selected):
+    for other in selected:
+        smaller = min(len(shingles), len(other))
+        if smaller and len(shingles & other) / smaller >= DUPLICATE_OVERLAP:
+            return True
+    return False
+
+
+def pack_context(chunks, max_tokens=CONTEXT_TOKEN_BUDGET):
+    parts, selected = [], []
+    used = 0
+
+    for chunk in chunks:
+        content = chunk.get("content", "").strip()
+        if not content:
+            continue
+        shingles = _shingles(content)
+        if _is_duplicate(shingles, selected):
+            continue
+
+        filename = chunk.get("filename", chunk.get("metadata", {}).get("filename", "Unknown"))
+        block = f"From {filename}:\n{content}"
+        tokens = count_tokens(block)
+
+        if used + tokens > max_tokens:
+            remaining = max_tokens - used
+            if remaining >= MIN_PARTIAL_TOKENS:
+                parts.append(truncate_to_tokens(block, remaining))
+                used = max_tokens
+            break
+
+        parts.append(block)
+        selected.append(shingles)
+        used += tokens
+
+    annotate(prompt_tokens=used, packed_chunks=len(parts))
+    return "\n\n".join(parts)
+
+
+def cot_prompt(query, chunks, max_context_tokens=CONTEXT_TOKEN_BUDGET):
     """
     WHAT DOES THIS DO??
     -----------
@@ -11,10 +82,13 @@ def cot_prompt(query, chunks):
         The user query to be answered by the model.
 
     chunks : list of dict
-        A list of context chunks from source documents. Each chunk should contain:
-            - 'content': list of text segments (e.g., paragraphs)
+        A list of context chunks from source documents, most relevant first. Each chunk should contain:
+            - 'content': the chunk text
             - 'filename' or 'metadata': optional source information
 
+    max_context_tokens : int
+        Token budget for the context block (counted with a real tokenizer).
+
     Returns:
     -------
     prompt : str
@@ -25,19 +99,16 @@ def cot_prompt(query, chunks):
 
     Details:
     --------
-    - Each chunk’s content is truncated to ensure compatibility with model token limits.
+    - Each chunk appears once, with its source label; near-duplicates are dropped and the context
+      is filled in relevance order up to the token budget, so prompt size grows linearly with k.
     - The prompt enforces step-by-step, transparent reasoning.
     - Useful in Retrieval-Augmented Generation (RAG) pipelines where factual grounding is necessary.
     """
 
-    
-    context = ""
-    for chunk in chunks:
-        filename = chunk.get("filename", chunk.get("metadata", {}).get("filename", "Unknown"))
-        content = "\n\n".join(chunk["content"][:1000] for chunk in chunks)
-        context += f"\n\nFrom {filename}:\n{content}"
 
-    return f"""You are a smart assistant. Use clear, step-by-step reasoning to answer based on the provided context.
+    with span("cot_prompt", items=len(chunks)) as s:
+        context = pack_context(chunks, max_context_tokens)
+        prompt = f"""You are a smart assistant. Use clear, step-by-step reasoning to answer based on the provided context.
 
 Before answering, follow these steps:
 1. Understand the question and its assumptions.
@@ -86,3 +157,5 @@ Context:
 
 Question: {query}
 Answer:"""
+        s.set(bytes=len(prompt))
+    return prompt
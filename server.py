@@ -0,0 +1,258 @@
+"""
+RAG OVER HTTP
+-------------
+
+The same pipeline as app.py (load -> chunk -> index -> retrieve -> prompt -> Groq, via
+utils/pipeline.py), served as an ASGI app so many users share one process instead of each
+Streamlit session redoing the work.
+
+What's shared:
+--------------
+- One warm pipeline per process: the embedding model and reranker are loaded at startup, and
+  the last persisted index (RAG_INDEX_DIR) is opened memory-mapped if there is one.
+- Query micro-batching: concurrent requests wait up to RAG_SERVER_BATCH_WINDOW_MS (default 5)
+  for company, then up to RAG_SERVER_MAX_BATCH (default 32) queries are routed, embedded and
+  searched together with RAGPipeline.prepare_many — one model call, one matrix search.
+  Identical queries in the same batch are retrieved once.
+  Single-query embeddings from other paths share forward passes via utils/embedding_service.py.
+- Coalescing: identical /query requests already in flight share one retrieval and one LLM call.
+  (/query/stream shares the retrieval only; every stream gets its own Groq call.)
+
+Endpoints:
+----------
+- POST /ingest         multipart `files` (pdf/txt/json/xml/xlsx). The uploaded set becomes the
+                       corpus; unchanged files come from the index cache (utils/index_store.py).
+- POST /query          {"query": "...", "top_k": 5} -> answer, chunks, route, plan, timings
+                       (top_k from 1 to RAG_SERVER_MAX_TOP_K, default 50; anything else is a 422)
+- POST /query/stream   Same body -> NDJSON: one {"type": "meta"} line (route, chunks), then
+                       {"type": "token", "text": ...} lines, then {"type": "done", "answer", "timings"}
+                       — or {"type": "error", "error": ...} as the last line if the answer fails
+- GET  /health         Whether an index is loaded, and its size
+- GET  /metrics        Per-stage timings (utils/tracing.py) in Prometheus text format
+
+Usage:
+------
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+One worker process per core is the way to scale out; each worker keeps its own warm copy.
+"""
+
+
+import asyncio
+import contextlib
+import copy
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from utils.embeddings import get_model
+from utils.file_loader import PARSERS, BytesFile
+from utils.pipeline import RAGPipeline
+from utils.reranker import get_reranker
+from utils.retriever import generate_response, stream_response
+from utils.tracing import export_prometheus
+
+
+BATCH_WINDOW_MS = float(os.getenv("RAG_SERVER_BATCH_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("RAG_SERVER_MAX_BATCH", "32"))
+MAX_TOP_K = int(os.getenv("RAG_SERVER_MAX_TOP_K", "50"))
+PRIVATE_FIELDS = ("prompt", "content", "vector")
+
+
+class QueryRequest(BaseModel):
+    query: str
+    top_k: Optional[int] = Field(None, ge=1, le=MAX_TOP_K)
+
+
+class QueryBatcher:
+    """Collects concurrent prepare() calls for a few milliseconds and runs them as one prepare_many()."""
+
+    def __init__(self, pipeline, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.pipeline = pipeline
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+
+    async def prepare(self, query, top_k=None):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, top_k, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        # One prepare_many per top_k; identical queries are retrieved once and fanned out
+        groups = {}
+        for query, top_k, future in batch:
+            groups.setdefault(top_k, {}).setdefault(query, []).append(future)
+
+        for top_k, waiting in groups.items():
+            try:
+                results = await run_in_threadpool(self.pipeline.prepare_many, list(waiting), top_k)
+            except Exception as e:
+                for futures in waiting.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+            for result, futures in zip(results, waiting.values()):
+                for i, future in enumerate(futures):
+                    if not future.done():
+                        future.set_result(result if i == 0 else copy.deepcopy(result))
+
+
+pipeline = RAGPipeline()
+batcher = QueryBatcher(pipeline)
+ingest_lock = asyncio.Lock()
+in_flight = {}  # (query, top_k, index version) -> task answering it
+
+
+def _warm_up():
+    get_model()
+    get_reranker()
+    try:
+        pipeline.load()
+        print(f"Serving {len(pipeline.index)} chunks from {pipeline.index_dir}")
+    except ValueError as e:
+        print(f"Starting without an index: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(_warm_up)
+    batcher.start()
+    yield
+    await batcher.stop()
+
+
+app = FastAPI(title="NEXTURN RAG", lifespan=lifespan)
+
+
+def _public(result):
+    return {key: value for key, value in result.items() if key not in PRIVATE_FIELDS}
+
+
+def _require_index():
+    if pipeline.index is None:
+        raise HTTPException(409, "Nothing ingested yet: POST some files to /ingest first.")
+    return pipeline.index
+
+
+@app.get("/health")
+def health():
+    index = pipeline.index
+    return {"ready": index is not None, "chunks": len(index) if index is not None else 0,
+            "files": len(index.file_ids) if index is not None else 0}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return export_prometheus()
+
+
+@app.post("/ingest")
+async def ingest(files: list[UploadFile] = File(...)):
+    unsupported = [f.filename for f in files if os.path.splitext(f.filename or "")[1].lower() not in PARSERS]
+    if unsupported:
+        raise HTTPException(400, f"Unsupported file type(s): {', '.join(unsupported)}; "
+                                 f"supported: {', '.join(sorted(PARSERS))}")
+    uploads = [BytesFile(f.filename, await f.read()) for f in files]
+
+    start = time.perf_counter()
+    async with ingest_lock:
+        try:
+            index = await run_in_threadpool(pipeline.ingest, uploads)
+        except ValueError as e:  # e.g. nothing could be extracted from the uploads
+            raise HTTPException(400, str(e))
+    return {"files": list(index.file_ids), "chunks": len(index), "version": index.version,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def _answer(query, top_k):
+    result = await batcher.prepare(query, top_k)
+    if result["answer"] is None:
+        start = time.perf_counter()
+        answer = await run_in_threadpool(generate_response, result["prompt"])
+        pipeline.record_answer(result, answer, time.perf_counter() - start)
+    return _public(result)
+
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    index = _require_index()
+    text = request.query.strip()
+    if not text:
+        raise HTTPException(400, "Empty query.")
+
+    key = (text, request.top_k, index.version)
+    task = in_flight.get(key)
+    coalesced = task is not None
+    if task is None:
+        task = in_flight[key] = asyncio.ensure_future(_answer(text, request.top_k))
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+    # shield: one client disconnecting must not cancel the answer others are waiting for
+    result = await asyncio.shield(task)
+    return dict(result, coalesced=coalesced)
+
+
+def _line(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    _require_index()
+    text = request.query.strip()
+    if not text:
+        raise HTTPException(400, "Empty query.")
+    result = await batcher.prepare(text, request.top_k)
+
+    def events():
+        yield _line(dict(_public(result), type="meta", answer=None))
+        try:
+            if result["answer"] is not None:
+                yield _line({"type": "token", "text": result["answer"]})
+            else:
+                start, pieces = time.perf_counter(), []
+                for piece in stream_response(result["prompt"]):
+                    pieces.append(piece)
+                    yield _line({"type": "token", "text": piece})
+                pipeline.record_answer(result, "".join(pieces), time.perf_counter() - start)
+        except Exception as e:
+            # Headers are already sent: report it in-band and end the stream cleanly
+            print(f"Streaming answer failed: {e}")
+            yield _line({"type": "error", "error": str(e)})
+            return
+        yield _line({"type": "done", "answer": result["answer"], "timings": result["timings"]})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from benchmarks.stub_llm import ANSWER, StubLLMServer
+from utils import retriever
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Points the retriever at a fresh stub server, with a rate limiter that never gets in the way."""
+    def start(**options):
+        stub = StubLLMServer(**options)
+        monkeypatch.setattr(retriever, "GROQ_API_URL", stub.start())
+        servers.append(stub)
+        return stub
+
+    servers = []
+    monkeypatch.setattr(retriever, "rate_limiter", retriever.TokenBucket(1000))
+    monkeypatch.setattr(retriever, "BACKOFF_BASE", 0.05)
+    retriever.call_metrics.clear()
+    yield start
+    for stub in servers:
+        stub.stop()
+
+
+def test_retries_429_with_backoff(groq):
+    stub = groq(latency=0.01, throttle=2)
+    start = time.perf_counter()
+    assert retriever.generate_response("When was Flipkart founded?") == ANSWER
+    elapsed = time.perf_counter() - start
+
+    assert stub.stats["requests"] == 3 and stub.stats["throttled"] == 2
+    assert elapsed >= 0.05 + 0.1  # BACKOFF_BASE * 2**0 + BACKOFF_BASE * 2**1
+    (metrics,) = retriever.get_call_metrics()
+    assert metrics["status"] == 200 and metrics["attempts"] == 3
+
+
+def test_gives_up_after_max_retries(groq, monkeypatch):
+    monkeypatch.setattr(retriever, "BACKOFF_BASE", 0.001)
+    stub = groq(throttle=100)
+    assert retriever.generate_response("When was Flipkart founded?").strip().startswith("Error")
+    assert stub.stats["requests"] == retriever.MAX_RETRIES + 1
+    assert retriever.get_call_metrics()[-1]["status"] == 429
+
+
+def test_generate_many_caps_concurrency(groq):
+    stub = groq(latency=0.1)
+    answers = retriever.generate_many([f"question {i}" for i in range(12)], max_concurrency=3)
+
+    assert answers == [ANSWER] * 12
+    assert stub.stats["requests"] == 12
+    assert stub.stats["peak_in_flight"] == 3
+
+
+def test_streamed_and_blocking_metrics_match(groq):
+    groq(latency=0.05)
+    retriever.generate_response("When was Flipkart founded?")
+    assert "".join(retriever.stream_response("When was Flipkart founded?")) == ANSWER
+
+    blocking, streamed = retriever.get_call_metrics()
+    assert blocking.keys() == streamed.keys()
+    assert not blocking["streamed"] and streamed["streamed"]
+    assert streamed["status"] == 200 and streamed["chunks"] == len(ANSWER.split())
+    assert 0 < streamed["ttft"] <= streamed["latency"]
@@ -0,0 +1,200 @@
+"""
+WHY answer_cache.py?
+--------------------
+
+Semantic answer cache — "Who founded Flipkart?" and "who were Flipkart's founders" should not
+both pay for retrieval plus a full Groq call.
+
+How it works:
+-------------
+- Each cached answer is stored with the embedding of the question that produced it.
+- A new question is a hit when its cosine similarity to a cached question in the same scope
+  (the index version, so answers never outlive the documents they came from) is above the threshold
+  AND both mention the same numbers, months and capitalised names — MiniLM puts "revenue in 2023"
+  and "revenue in 2024" almost on top of each other, but they are different questions.
+- Entries are evicted least-recently-used past max_entries, and expire after ttl_seconds.
+- Optionally persisted to disk so the cache survives restarts: one cache.npz holding entries and
+  vectors together, swapped in atomically. Processes sharing the path merge their entries on
+  save (under a file lock) instead of overwriting each other's.
+
+Class / Functions:
+------------------
+- SemanticCache(threshold, max_entries, ttl_seconds, path):
+    lookup(query, scope, vector=None) -> cached entry dict or None
+    store(query, answer, chunks, scope, vector=None)
+    (pass the query's embedding as vector= when you already have it)
+    stats() -> hits, misses, evictions, size, hit rate
+- query_signature(query): The numbers, months and names a hit must agree on.
+- get_answer_cache(): Process-wide cache configured from RAG_ANSWER_CACHE_* env vars.
+"""
+
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.embedding_service import embed_one
+from utils.file_lock import locked
+from utils.query_router import route_query
+
+
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def query_signature(query):
+    plan = route_query(query)
+    return [
+        sorted(set(NUMBER_PATTERN.findall(query))),
+        sorted(plan["dates"]),
+        sorted({entity.lower() for entity in plan["entities"]}),
+    ]
+
+
+class SemanticCache:
+    def __init__(self, threshold=0.92, max_entries=1000, ttl_seconds=24 * 3600, path=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.entries = OrderedDict()  # entry id -> entry, least recently used first
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer at a time; lookups only need self.lock
+        if path:
+            self.load()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        if not self.ttl_seconds:
+            return
+        expired = [eid for eid, entry in self.entries.items() if now - entry["created"] > self.ttl_seconds]
+        for eid in expired:
+            del self.entries[eid]
+        self.evictions += len(expired)
+
+    def lookup(self, query, scope, vector=None):
+        vector = self._normalize(embed_one(query) if vector is None else vector)
+        signature = query_signature(query)
+        with self.lock:
+            self._expire(time.time())
+            candidates = [(eid, entry) for eid, entry in self.entries.items()
+                          if entry["scope"] == scope and entry["signature"] == signature]
+            if candidates:
+                similarities = np.stack([entry["vector"] for _, entry in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    eid, entry = candidates[best]
+                    self.entries.move_to_end(eid)
+                    self.hits += 1
+                    return dict(entry, similarity=float(similarities[best]))
+            self.misses += 1
+            return None
+
+    def store(self, query, answer, chunks, scope, vector=None):
+        vector = self._normalize(embed_one(query) if vector is None else vector)
+        with self.lock:
+            self.entries[self.next_id] = {
+                "query": query,
+                "answer": answer,
+                "chunks": chunks,
+                "scope": scope,
+                "signature": query_signature(query),
+                "vector": vector,
+                "created": time.time(),
+            }
+            self.next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        if self.path:
+            self.save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _read(self):
+        path = os.path.join(self.path, "cache.npz")
+        if not os.path.exists(path):
+            return []
+        with np.load(path) as saved:
+            meta = json.loads(str(saved["entries"]))
+            vectors = saved["vectors"]
+        if len(meta) != len(vectors):
+            print("Answer cache on disk is inconsistent; ignoring it.")
+            return []
+        return [dict(entry, signature=entry.get("signature") or query_signature(entry["query"]), vector=vector)
+                for entry, vector in zip(meta, vectors)]
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self.save_lock, locked(self.path, exclusive=True):
+            with self.lock:
+                entries = list(self.entries.values())
+            # Other workers may share the path: merge their entries in, newest copy of a question wins
+            merged = {(entry["scope"], entry["query"]): entry for entry in self._read()}
+            for entry in entries:
+                key = (entry["scope"], entry["query"])
+                if key not in merged or merged[key]["created"] <= entry["created"]:
+                    merged[key] = entry
+            entries = sorted(merged.values(), key=lambda entry: entry["created"])[-self.max_entries:]
+
+            meta = [{key: value for key, value in entry.items() if key != "vector"} for entry in entries]
+            vectors = np.stack([entry["vector"] for entry in entries]) if entries else np.zeros((0, 0), dtype=np.float32)
+            # One file, one os.replace: entries and vectors can never be read from different saves
+            tmp = os.path.join(self.path, f"cache.{uuid.uuid4().hex[:12]}.tmp.npz")
+            np.savez(tmp, entries=np.asarray(json.dumps(meta)), vectors=vectors)
+            os.replace(tmp, os.path.join(self.path, "cache.npz"))
+
+    def load(self):
+        if not os.path.isdir(self.path):
+            return
+        with locked(self.path):
+            entries = self._read()
+        with self.lock:
+            for entry in entries:
+                self.entries[self.next_id] = entry
+                self.next_id += 1
+            self._expire(time.time())
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    threshold=float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.92")),
+                    max_entries=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1000")),
+                    ttl_seconds=float(os.getenv("RAG_ANSWER_CACHE_TTL", str(24 * 3600))),
+                    path=os.getenv("RAG_ANSWER_CACHE_PATH") or None,
+                )
+    return _cache
@@ -0,0 +1,86 @@
+"""
+BULK RETRIEVAL FROM THE COMMAND LINE
+------------------------------------
+
+Runs get_top_chunks_batch over a JSONL file of questions (one JSON object per line) — for
+nightly evals and bulk QA without the Streamlit app.
+
+Each input line needs a question under one of: "question", "query", "title" (or pass --field).
+Each output line echoes the input object and adds "chunks": [{"content", "filename"}, ...].
+
+Usage:
+------
+    # search the index the app has already built and cached
+    python -m utils.batch_query questions.jsonl --out retrieved.jsonl
+
+    # (re)index a directory first, then search it
+    python -m utils.batch_query questions.jsonl --data-dir data/ --k 5
+"""
+
+
+import argparse
+import json
+import sys
+import time
+
+from utils.faiss_handler import get_top_chunks_batch
+from utils.file_loader import open_local_files
+from utils.index_manager import IndexManager
+from utils.index_store import INDEX_DIR, build_cached_index, latest_manager_dir
+
+
+QUESTION_FIELDS = ("question", "query", "title")
+
+
+def read_questions(path, field=None):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = field or next((name for name in QUESTION_FIELDS if name in record), None)
+            if key is None or not record.get(key):
+                raise ValueError(f"{path}:{line_no}: no question field (tried {field or QUESTION_FIELDS})")
+            records.append((record, record[key]))
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("--data-dir", help="Index this directory first (uses the on-disk cache)")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="Index cache directory")
+    parser.add_argument("--field", help="JSON field holding the question")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--out", help="Output JSONL (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.data_dir:
+        index, _ = build_cached_index(open_local_files(args.data_dir), args.index_dir)
+    else:
+        path = latest_manager_dir(args.index_dir)
+        index = IndexManager.load(path, mmap=True) if path else IndexManager()
+        if not len(index):
+            parser.error(f"No index found in {args.index_dir}; pass --data-dir to build one.")
+
+    records = read_questions(args.questions, args.field)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    start = time.perf_counter()
+    try:
+        for offset in range(0, len(records), args.batch_size):
+            batch = records[offset:offset + args.batch_size]
+            results = get_top_chunks_batch(index, [question for _, question in batch], k=args.k)
+            for (record, _), chunks in zip(batch, results):
+                out.write(json.dumps(dict(record, chunks=chunks)) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Retrieved for {len(records)} questions in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+WHAT IS bm25.py?
+----------------
+
+A small inverted-index BM25 engine — the lexical half of hybrid retrieval. Years, names and
+other exact terms are cheap to look up here and easy for dense embeddings to blur.
+
+How it works:
+-------------
+- Postings live in a SciPy sparse matrix (documents x terms), with the BM25 weight of every
+  (document, term) pair precomputed at build time.
+- Scoring a query is just summing a handful of columns — no per-document Python loop.
+- Terms passed as boost_terms (years, entity names) get their weight multiplied.
+
+Class:
+------
+- BM25Index(k1=1.5, b=0.75):
+    build(ids, texts): Index a corpus; ids are the vector IDs used by the FAISS side.
+    search(query, k, boost_terms=None, ids=None): Top-k (id, score) pairs, optionally within ids.
+    save(path) / load(path): Persist as .npz + JSON vocabulary.
+"""
+
+
+import json
+import os
+import re
+
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how in is it its of on or "
+    "that the this to was were what when where which who whom why will with".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        from scipy import sparse
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.weights = sparse.csc_matrix((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids, texts):
+        from scipy import sparse
+        vocab = {}
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                rows.append(row)
+                cols.append(vocab.setdefault(token, len(vocab)))
+
+        n_docs = len(texts)
+        tf = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_docs, len(vocab)),
+        )
+        tf.sum_duplicates()
+
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if n_docs else 0.0
+        df = np.bincount(tf.indices, minlength=len(vocab))
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # BM25 term weight per posting, computed once on the sparse data array
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len) if avg_len else np.full(n_docs, self.k1)
+        row_of_entry = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        data = tf.data * (self.k1 + 1) / (tf.data + norm[row_of_entry]) * idf[tf.indices]
+        weights = sparse.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+
+        self.vocab = vocab
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.weights = weights.tocsc()  # column access = postings list per term
+        return self
+
+    def search(self, query, k=10, boost_terms=None, boost=2.0, ids=None):
+        boosted = {term.lower() for term in boost_terms or ()}
+        cols, factors = [], []
+        for token in set(tokenize(query)) | {term for term in boosted if term in self.vocab}:
+            col = self.vocab.get(token)
+            if col is not None:
+                cols.append(col)
+                factors.append(boost if token in boosted else 1.0)
+        if not cols or not len(self.ids):
+            return []
+
+        scores = self.weights[:, cols] @ np.asarray(factors, dtype=np.float32)
+        scores = np.asarray(scores).ravel()
+        if ids is not None:
+            scores[~np.isin(self.ids, np.fromiter(ids, dtype=np.int64, count=len(ids)))] = 0
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+    def save(self, path):
+        from scipy import sparse
+        os.makedirs(path, exist_ok=True)
+        sparse.save_npz(os.path.join(path, "bm25_weights.npz"), self.weights)
+        np.save(os.path.join(path, "bm25_ids.npy"), self.ids)
+        with open(os.path.join(path, "bm25_vocab.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "vocab": self.vocab}, f)
+
+    @classmethod
+    def load(cls, path):
+        from scipy import sparse
+        vocab_path = os.path.join(path, "bm25_vocab.json")
+        if not os.path.exists(vocab_path):
+            return None
+        with open(vocab_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(meta["k1"], meta["b"])
+        index.vocab = meta["vocab"]
+        index.ids = np.load(os.path.join(path, "bm25_ids.npy"))
+        index.weights = sparse.load_npz(os.path.join(path, "bm25_weights.npz")).tocsc()
+        return index
@@ -2,44 +2,87 @@
 WHAT'S THIS FILE FOR?
 -------------------
 
-chunk_sections(documents):
+chunk_sections(documents, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
     Breaks documents into readable chunks based on headings, numbered lists, or section markers.
     Works with both raw strings and dictionaries (because sometimes data is messy).
 
     - Uses regex magic to split on newlines before headers like '#', '1. ', or 'Section 3'.
+    - Any section longer than max_tokens (real tokenizer count) is cut into overlapping windows,
+      so a heading-less PDF no longer turns into one giant chunk.
+    - Structured records (json/xml/xlsx) skip the heading split and are only windowed if too long.
     - Strips whitespace.
-    - Keeps track of where each chunk came from (filename included).
+    - Keeps track of where each chunk came from (filename, plus type/page/sheet/row when known).
 
     Returns a list of tidy content chunks, each wrapped with filename info for future detective work.
+
+iter_chunks(documents, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    Same thing as a generator — consumes documents lazily and yields chunks as it goes, so it
+    can sit between the streaming loader and the embedder.
 """
 
 
+import os
 import re
 
-def chunk_sections(documents):
-    chunks = []
+from utils.tokenizer import token_spans
+from utils.tracing import span
+
+CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "256"))  # MiniLM truncates beyond 256 word pieces
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "32"))
+STRUCTURED_TYPES = {"json", "xml", "xlsx"}
+CARRIED_METADATA = ("type", "page", "sheet", "row")
+
+SECTION_BREAK = re.compile(r'\n(?=(?:#{1,6} |\d+\.\s+|Section\s+\d+))')
+
+
+def split_windows(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    # Every token covers at least one character, so short texts can skip tokenization entirely
+    if len(text) <= max_tokens:
+        return [text]
+    spans = token_spans(text)
+    if len(spans) <= max_tokens:
+        return [text]
+
+    step = max(1, max_tokens - overlap)
+    windows = []
+    for start in range(0, len(spans), step):
+        stop = min(start + max_tokens, len(spans))
+        windows.append(text[spans[start][0]:spans[stop - 1][1]])
+        if stop == len(spans):
+            break
+    return windows
+
 
+def iter_chunks(documents, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
     for doc in documents:
         # Handle both dicts and raw strings
         if isinstance(doc, dict):
             content = doc.get("content", "")
             filename = doc.get("filename", "Unknown")
+            metadata = {key: doc[key] for key in CARRIED_METADATA if key in doc}
         else:
             content = doc
             filename = "Unknown"
+            metadata = {}
 
-        split_sections = re.split(r'\n(?=(?:#{1,6} |\d+\.\s+|Section\s+\d+))', content)
-
+        if metadata.get("type") in STRUCTURED_TYPES:
+            split_sections = [content]
+        else:
+            split_sections = SECTION_BREAK.split(content)
 
         for section in split_sections:
             cleaned = section.strip()
-            if cleaned:
-                chunks.append({
-                    "content": cleaned,
+            if not cleaned:
+                continue
+            for window in split_windows(cleaned, max_tokens, overlap):
+                yield dict({
+                    "content": window.strip(),
                     "filename": filename
-                })
-
-    return chunks
-
+                }, **metadata)
 
 
+def chunk_sections(documents, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    with span("chunk_sections") as s:
+        chunks = list(iter_chunks(documents, max_tokens, overlap))
+        s.set(items=len(chunks), bytes=sum(len(chunk["content"]) for chunk in chunks))
+    return chunks
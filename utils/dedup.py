@@ -0,0 +1,211 @@
+"""
+WHY dedup.py?
+-------------
+
+The data folder says the same thing many times over: flipkart1.txt … flipkart10.txt, the PDFs
+and the spreadsheet overlap heavily. Embedding every copy wastes compute, indexing every copy
+wastes memory, and retrieving every copy wastes top-k slots on the same paragraph.
+
+How duplicates are spotted:
+---------------------------
+- Exact: sha1 of the text with whitespace collapsed and case folded.
+- Near (off by default; RAG_NEAR_DUP_BITS=3 turns it on): 64-bit SimHash over word 3-shingles.
+  Two chunks within RAG_NEAR_DUP_BITS bits of each other that also mention exactly the same
+  numbers (years, figures) count as the same chunk — a report that only changes its year and
+  revenue is different content. Lookups use banding: the fingerprint is cut into
+  RAG_NEAR_DUP_BITS + 1 bands, and any two fingerprints that close must agree on at least one
+  whole band, so only same-band candidates get compared.
+  Chunks shorter than NEAR_DUP_MIN_TOKENS words are matched exactly only.
+- Near-duplicates only ever share an embedding (embed_unique); the index collapses exact
+  duplicates alone, so every near-duplicate keeps its own text, BM25 terms and metadata.
+
+Functions:
+----------
+- content_hash(text) / simhash(text): The two fingerprints.
+- embed_unique(texts): embed_texts, but every distinct (or near-identical) text is embedded
+  once, and texts seen before in this process come from a chunk-hash -> vector cache.
+- clear_embedding_cache(): Forget every cached vector (e.g. between benchmark repeats).
+
+Class:
+------
+- DuplicateIndex:
+    add(vid, text) / remove(vid): Register or forget a chunk's fingerprints.
+    find(text): Vector id of an already-registered duplicate of text, or None.
+    fingerprint(text): (content hash, simhash, numbers hash) — pass it to find/add to hash a
+      text only once.
+    save(path) / load(path): Persist the fingerprints (.npz), so a loaded index can dedup new
+      chunks without re-hashing every stored one.
+    IndexManager uses it to collapse duplicate chunks into one vector owned by several files.
+"""
+
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from utils.embeddings import EMBEDDING_MODEL, embed_texts
+
+
+NEAR_DUP_BITS = int(os.getenv("RAG_NEAR_DUP_BITS", "0"))  # 0 = exact duplicates only
+NEAR_DUP_MIN_TOKENS = 20
+SHINGLE_SIZE = 3
+EMBED_CACHE_SIZE = int(os.getenv("RAG_EMBED_CACHE_SIZE", "100000"))
+WORD_PATTERN = re.compile(r"\w+")
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+
+
+def content_hash(text):
+    return hashlib.sha1(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+def _words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+def simhash(text, words=None):
+    words = _words(text) if words is None else words
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Each bit is set if most shingle hashes have it set
+    votes = ((hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)).sum(axis=0)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votes * 2 > len(hashes)))
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class DuplicateIndex:
+    def __init__(self, max_distance=NEAR_DUP_BITS):
+        self.max_distance = max_distance
+        self.band_bits = 64 // (max_distance + 1)
+        self.exact = {}                    # content hash -> vid
+        self.bands = defaultdict(set)      # (band number, band value) -> vids
+        self.fingerprints = {}             # vid -> (content hash, simhash or None, numbers hash or None)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def fingerprint(self, text):
+        words = _words(text)
+        if not self.max_distance or len(words) < NEAR_DUP_MIN_TOKENS:
+            return content_hash(text), None, None
+        numbers = " ".join(sorted(set(NUMBER_PATTERN.findall(text))))
+        return content_hash(text), simhash(text, words), hashlib.sha1(numbers.encode("utf-8")).hexdigest()
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.max_distance + 1)]
+
+    def find(self, text, fingerprints=None):
+        exact, near, numbers = fingerprints or self.fingerprint(text)
+        if exact in self.exact:
+            return self.exact[exact]
+        if near is None:
+            return None
+        candidates = {vid for key in self._band_keys(near) for vid in self.bands.get(key, ())
+                      if self.fingerprints[vid][2] == numbers}
+        best = min(candidates, key=lambda vid: (hamming(near, self.fingerprints[vid][1]), vid), default=None)
+        if best is not None and hamming(near, self.fingerprints[best][1]) <= self.max_distance:
+            return best
+        return None
+
+    def add(self, vid, text, fingerprints=None):
+        exact, near, numbers = fingerprints or self.fingerprint(text)
+        self.fingerprints[vid] = (exact, near, numbers)
+        self.exact.setdefault(exact, vid)
+        if near is not None:
+            for key in self._band_keys(near):
+                self.bands[key].add(vid)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        vids = sorted(self.fingerprints)
+        np.savez(
+            os.path.join(path, "duplicates.npz"),
+            ids=np.asarray(vids, dtype=np.int64),
+            exact=np.asarray([self.fingerprints[vid][0] for vid in vids], dtype="U40"),
+            near=np.asarray([self.fingerprints[vid][1] or 0 for vid in vids], dtype=np.uint64),
+            has_near=np.asarray([self.fingerprints[vid][1] is not None for vid in vids], dtype=bool),
+            numbers=np.asarray([self.fingerprints[vid][2] or "" for vid in vids], dtype="U40"),
+            max_distance=self.max_distance,
+        )
+
+    @classmethod
+    def load(cls, path, max_distance=NEAR_DUP_BITS):
+        saved_path = os.path.join(path, "duplicates.npz")
+        if not os.path.exists(saved_path):
+            return None
+        saved = np.load(saved_path)
+        if int(saved["max_distance"]) != max_distance:
+            return None  # fingerprinted under another setting: rebuild
+        index = cls(max_distance)
+        rows = zip(saved["ids"], saved["exact"], saved["near"], saved["has_near"], saved["numbers"])
+        for vid, exact, near, has_near, numbers in rows:
+            index.add(int(vid), None, (str(exact), int(near), str(numbers)) if has_near else (str(exact), None, None))
+        return index
+
+    def remove(self, vid):
+        exact, near, _ = self.fingerprints.pop(vid, (None, None, None))
+        if self.exact.get(exact) == vid:
+            del self.exact[exact]
+        if near is not None:
+            for key in self._band_keys(near):
+                self.bands[key].discard(vid)
+                if not self.bands[key]:
+                    del self.bands[key]
+
+
+_cache = OrderedDict()  # (model, content hash) -> vector, least recently used first
+_cache_lock = threading.Lock()
+
+
+def embed_unique(texts, batch_size=64, name=EMBEDDING_MODEL):
+    """embed_texts with exact/near-duplicate collapsing and a process-wide chunk-hash cache."""
+    if not texts:
+        return embed_texts([], name=name)
+    vectors = [None] * len(texts)
+    seen = DuplicateIndex()
+    representative = {}  # index into texts -> index of the text whose vector it reuses
+    misses = []
+    for i, text in enumerate(texts):
+        fingerprints = seen.fingerprint(text)
+        with _cache_lock:
+            cached = _cache.get((name, fingerprints[0]))
+            if cached is not None:
+                _cache.move_to_end((name, fingerprints[0]))
+        if cached is not None:
+            vectors[i] = cached
+            continue
+        match = seen.find(text, fingerprints)
+        if match is not None:
+            representative[i] = match
+            continue
+        seen.add(i, text, fingerprints)
+        misses.append(i)
+
+    if misses:
+        embedded = embed_texts([texts[i] for i in misses], batch_size=batch_size, name=name)
+        with _cache_lock:
+            for i, vector in zip(misses, embedded):
+                vectors[i] = vector
+                _cache[(name, seen.fingerprints[i][0])] = vector
+            while len(_cache) > EMBED_CACHE_SIZE:
+                _cache.popitem(last=False)
+    for i, source in representative.items():
+        vectors[i] = vectors[source]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def clear_embedding_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,152 @@
+"""
+WHO'S WAITING FOR THE MODEL?
+----------------------------
+
+An in-process micro-batching front for the embedding model. A single query is a batch of one,
+which leaves most of MiniLM's throughput unused; when several threads (server requests, the
+concurrent evaluation, parallel similarity searches) each embed a query at about the same time,
+it's much cheaper to encode them together.
+
+How it works:
+-------------
+- Callers submit texts and get a Future back (or block on it via embed / embed_one).
+- One worker thread per model drains the queue: it flushes as soon as RAG_EMBED_BATCH_ITEMS
+  (default 16) texts are waiting, or RAG_EMBED_BATCH_WINDOW_MS (default 5) after the first one
+  arrived, runs a single forward pass, and fans the rows back out to each caller's future.
+- A request that is already a full batch (e.g. indexing thousands of chunks) skips the queue and
+  is encoded right away in the caller's thread — waiting wouldn't make it any cheaper.
+- RAG_EMBED_SERVICE=0 turns it off: every call goes straight to embeddings.embed_texts.
+
+Functions:
+----------
+- submit(texts, name=EMBEDDING_MODEL) -> Future of a float32 matrix, one row per text.
+- embed(texts, name=EMBEDDING_MODEL): submit(...).result().
+- embed_one(text, name=EMBEDDING_MODEL): One vector — the drop-in for embeddings.embed_query.
+- service_stats(): Requests, texts and batches per model (texts / batches = average batch size).
+"""
+
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.embeddings import EMBEDDING_MODEL, embed_texts
+from utils.tracing import span
+
+
+ENABLED = os.getenv("RAG_EMBED_SERVICE", "1") != "0"
+MAX_BATCH = int(os.getenv("RAG_EMBED_BATCH_ITEMS", "16"))
+WINDOW_MS = float(os.getenv("RAG_EMBED_BATCH_WINDOW_MS", "5"))
+
+_services = {}
+_lock = threading.Lock()
+
+
+class EmbeddingService:
+    def __init__(self, name=EMBEDDING_MODEL, max_batch=MAX_BATCH, window_ms=WINDOW_MS):
+        self.name = name
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.queue = queue.Queue()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "direct": 0}
+        self.stats_lock = threading.Lock()  # updated from every caller's thread and the worker
+        self.worker = threading.Thread(target=self._run, name=f"embed-{name}", daemon=True)
+        self.worker.start()
+
+    def submit(self, texts):
+        texts = list(texts)
+        future = Future()
+        direct = len(texts) >= self.max_batch
+        self._count(requests=1, direct=int(direct))
+        if direct:
+            # Already a full batch: nothing to gain from waiting for company
+            try:
+                future.set_result(embed_texts(texts, name=self.name))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.queue.put((texts, future))
+        return future
+
+    def _count(self, **deltas):
+        with self.stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        waiting = len(batch[0][0])
+        deadline = time.perf_counter() + self.window
+        while waiting < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            waiting += len(item[0])
+        return batch, waiting
+
+    def _run(self):
+        while True:
+            batch, _ = self._collect()
+            # Callers that cancelled while queued are dropped; the rest can no longer be cancelled,
+            # so set_result below can't raise InvalidStateError and kill this thread
+            batch = [(item_texts, future) for item_texts, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            waiting = len(texts)
+            try:
+                with span("embed_batch", items=waiting, requests=len(batch)):
+                    vectors = embed_texts(texts, batch_size=max(len(texts), 1), name=self.name)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._count(texts=waiting, batches=1)
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+def get_service(name=EMBEDDING_MODEL):
+    service = _services.get(name)
+    if service is None:
+        with _lock:
+            if name not in _services:
+                _services[name] = EmbeddingService(name)
+            service = _services[name]
+    return service
+
+
+def submit(texts, name=EMBEDDING_MODEL):
+    if not ENABLED or not texts:
+        future = Future()
+        future.set_result(embed_texts(list(texts), name=name))
+        return future
+    return get_service(name).submit(texts)
+
+
+def embed(texts, name=EMBEDDING_MODEL):
+    return submit(texts, name).result()
+
+
+def embed_one(text, name=EMBEDDING_MODEL):
+    return embed([text], name)[0]
+
+
+def service_stats():
+    return {name: service.snapshot() for name, service in _services.items()}
@@ -0,0 +1,128 @@
+"""
+WHAT IS embedding_store.py?
+---------------------------
+
+A compact on-disk home for embeddings and the chunks they belong to — memory-mapped at startup,
+so opening it costs the same for ten chunks or ten million.
+
+Layout (one directory):
+-----------------------
+- vectors.npy : contiguous (n, dim) matrix — float16 by default, or int8 with per-dim scales
+- scales.npy  : float32 per-dimension scales (int8 only); vector ≈ int8 value * scale
+- ids.npy     : int64 vector IDs, sorted, row-aligned with vectors
+- records.bin : UTF-8 JSON records ({"content", "metadata"}) back to back
+- offsets.npy : int64 byte offsets into records.bin (n + 1 entries)
+- meta.json   : dtype, dim, count
+
+Class:
+------
+- EmbeddingStore:
+    EmbeddingStore.write(path, ids, vectors, records, dtype="float16"): Write a store.
+    EmbeddingStore.open(path): Memory-map an existing store.
+    vectors(rows=None): Dequantized float32 vectors (all, or selected rows).
+    record(row) / row_of(vid) / contains(vid): Random access to one chunk without loading the rest.
+"""
+
+
+import json
+import os
+
+import numpy as np
+
+
+VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float16")
+DTYPES = ("float32", "float16", "int8")
+
+
+class EmbeddingStore:
+    def __init__(self, path, ids, vectors, scales, records, offsets):
+        self.path = path
+        self.ids = ids
+        self._vectors = vectors
+        self._scales = scales
+        self._records = records
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self._vectors.shape[1]
+
+    @staticmethod
+    def write(path, ids, vectors, records, dtype=VECTOR_DTYPE):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r}; expected one of {DTYPES}")
+        os.makedirs(path, exist_ok=True)
+
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(ids), -1 if len(ids) else vectors.shape[-1])
+        order = np.argsort(ids, kind="stable")
+        ids, vectors = ids[order], vectors[order]
+        records = [records[i] for i in order]
+
+        if dtype == "int8":
+            # Symmetric per-dimension scalar quantization
+            scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1])
+            scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+            np.save(os.path.join(path, "scales.npy"), scales)
+            stored = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+        else:
+            stored = vectors.astype(dtype)
+
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        with open(os.path.join(path, "records.bin"), "wb") as f:
+            for i, record in enumerate(records):
+                blob = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                f.write(blob)
+                offsets[i + 1] = offsets[i] + len(blob)
+
+        np.save(os.path.join(path, "vectors.npy"), stored)
+        np.save(os.path.join(path, "ids.npy"), ids)
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+        # meta.json goes last: its presence marks the store as complete
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": dtype, "dim": int(stored.shape[1]), "count": len(ids)}, f)
+
+    @classmethod
+    def open(cls, path):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        scales = None
+        if meta["dtype"] == "int8":
+            scales = np.load(os.path.join(path, "scales.npy"))
+        records_path = os.path.join(path, "records.bin")
+        records = np.memmap(records_path, dtype=np.uint8, mode="r") if os.path.getsize(records_path) else np.zeros(0, np.uint8)
+        return cls(
+            path,
+            ids=np.load(os.path.join(path, "ids.npy"), mmap_mode="r"),
+            vectors=np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            scales=scales,
+            records=records,
+            offsets=np.load(os.path.join(path, "offsets.npy"), mmap_mode="r"),
+        )
+
+    def vectors(self, rows=None):
+        stored = self._vectors if rows is None else self._vectors[np.asarray(rows)]
+        vectors = np.asarray(stored, dtype=np.float32)
+        return vectors * self._scales if self._scales is not None else vectors
+
+    def record(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._records[start:end].tobytes().decode("utf-8"))
+
+    def records(self):
+        return [self.record(row) for row in range(len(self))]
+
+    def row_of(self, vid):
+        row = int(np.searchsorted(self.ids, vid))
+        return row if row < len(self.ids) and self.ids[row] == vid else None
+
+    def contains(self, vid):
+        return self.row_of(vid) is not None
@@ -0,0 +1,69 @@
+"""
+WHO LOADS THE MODEL?
+--------------------
+
+One process-wide registry for sentence-transformer models, so MiniLM gets loaded once —
+lazily, on first use — and is shared by indexing, query embedding and evaluation.
+
+Functions:
+----------
+- get_model(name=EMBEDDING_MODEL):
+    Returns the shared SentenceTransformer, loading it on the first call (thread-safe).
+    Records load time and how much resident memory the load added.
+
+- embed_texts(texts, batch_size=64): Encodes a list of texts in one batched call -> float32 matrix.
+- embed_query(text): Encodes a single query -> float32 vector.
+- model_stats(): Load time / memory report for every model loaded so far.
+"""
+
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.tracing import rss_mb, span
+
+
+EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def get_model(name=EMBEDDING_MODEL):
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        if name not in _models:
+            from sentence_transformers import SentenceTransformer
+
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            _models[name] = SentenceTransformer(name, device="cpu")
+            _stats[name] = {
+                "load_seconds": round(time.perf_counter() - start, 3),
+                "rss_added_mb": round(rss_mb() - rss_before, 1),
+            }
+            print(f"Loaded embedding model {name}: {_stats[name]}")
+    return _models[name]
+
+
+def embed_texts(texts, batch_size=64, name=EMBEDDING_MODEL):
+    if not texts:
+        return np.zeros((0, get_model(name).get_sentence_embedding_dimension()), dtype=np.float32)
+    with span("embed", items=len(texts), bytes=sum(len(text) for text in texts)):
+        vectors = get_model(name).encode(list(texts), batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def embed_query(text, name=EMBEDDING_MODEL):
+    return embed_texts([text], name=name)[0]
+
+
+def model_stats():
+    return {name: dict(stats) for name, stats in _stats.items()}
@@ -16,22 +16,35 @@ Functions:
 ----------
 - tokenize(text): Turns a sentence into a set of lowercase word tokens. Punctuation? Gone.
 - compute_token_f1(ref, pred): Computes precision, recall, and F1 score between token sets.
-- evaluate_predictions(ground_truth, predictions):
-    Takes two dicts (question → answer), compares each pair, and returns a metrics summary.
+- evaluate_predictions_detailed(ground_truth, predictions):
+    Takes two dicts (question → answer) and returns per-question scores plus the aggregate.
+    All references and predictions are embedded in one batched call (through
+    embedding_service.py, so small concurrent evaluations share a forward pass); ROUGE/F1 scoring
+    moves to a process pool for large sets.
+- evaluate_predictions(ground_truth, predictions): Just the aggregate metrics summary.
 """
 
 
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.metrics import accuracy_score, f1_score
-from sentence_transformers import SentenceTransformer
-from rouge_score import rouge_scorer
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import multiprocessing
 import numpy as np
 
+import os
 import re
 
-# Load embedding model
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+from utils.embedding_service import embed
+
+
+ACCURACY_F1_THRESHOLD = 0.6
+PROCESS_POOL_THRESHOLD = 500  # below this many pairs, process startup costs more than it saves
+
+@lru_cache(maxsize=None)
+def get_scorer():
+    # rouge_score pulls in nltk (~1.5s); built on the first evaluation, once per process
+    from rouge_score import rouge_scorer
+
+    return rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
 
 def tokenize(text):
     # Simple word tokenizer
@@ -51,41 +64,57 @@ def compute_token_f1(reference, prediction):
 
     return precision, recall, f1
 
+def score_pair(reference, prediction):
+    scores = get_scorer().score(reference, prediction)
+    _, _, token_f1 = compute_token_f1(reference, prediction)
+    return scores["rouge1"].fmeasure, scores["rougeL"].fmeasure, token_f1
+
+def _lexical_scores(refs, preds, workers=None):
+    # ROUGE is pure Python and CPU-bound: fan out to processes only when it pays for the startup
+    if len(refs) < PROCESS_POOL_THRESHOLD:
+        return [score_pair(ref, pred) for ref, pred in zip(refs, preds)]
+
+    # spawn, not fork: the parent already runs torch/tokenizer threads, which a fork would copy mid-lock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunksize = max(1, len(refs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(score_pair, refs, preds, chunksize=chunksize))
+
+def _rowwise_cosine(a, b):
+    dots = np.einsum("ij,ij->i", a, b)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+def evaluate_predictions_detailed(ground_truth: dict, predictions: dict, workers=None):
+    questions = list(ground_truth)
+    refs = [ground_truth[q].strip() for q in questions]
+    preds = [predictions.get(q, "").strip() for q in questions]
+
+    # One batched encode for every reference and prediction, then row-wise cosine in NumPy
+    vectors = embed(refs + preds)
+    cosines = _rowwise_cosine(vectors[:len(refs)], vectors[len(refs):])
+
+    per_question = []
+    for question, cosine, (rouge1, rougel, token_f1) in zip(questions, cosines, _lexical_scores(refs, preds, workers)):
+        per_question.append({
+            "Question": question,
+            "ROUGE-1": rouge1,
+            "ROUGE-L": rougel,
+            "Cosine Similarity": float(cosine),
+            "F1_Score": token_f1,
+            # Accuracy logic: consider correct if token_f1 ≥ 0.6 (you can adjust threshold)
+            "Correct": token_f1 >= ACCURACY_F1_THRESHOLD,
+        })
+
+    if not per_question:
+        aggregate = {"ROUGE-1": 0.0, "ROUGE-L": 0.0, "Cosine Similarity": 0.0, "F1_Score": 0.0, "Accuracy": 0.0}
+    else:
+        aggregate = {
+            metric: round(float(np.mean([row[metric] for row in per_question])), 4)
+            for metric in ("ROUGE-1", "ROUGE-L", "Cosine Similarity", "F1_Score")
+        }
+        aggregate["Accuracy"] = round(sum(row["Correct"] for row in per_question) / len(per_question), 4)
+
+    return {"per_question": per_question, "aggregate": aggregate}
+
 def evaluate_predictions(ground_truth: dict, predictions: dict):
-    rouge1_list, rougel_list, cosine_list, token_f1_list = [], [], [], []
-    correct_count = 0
-
-    for question in ground_truth:
-        ref = ground_truth[question].strip()
-        pred = predictions.get(question, "").strip()
-
-        # ROUGE
-        scores = scorer.score(ref, pred)
-        rouge1_list.append(scores["rouge1"].fmeasure)
-        rougel_list.append(scores["rougeL"].fmeasure)
-
-        # Cosine similarity
-        emb_ref = model.encode([ref])[0]
-        emb_pred = model.encode([pred])[0]
-        cosine_sim = cosine_similarity([emb_ref], [emb_pred])[0][0]
-        cosine_list.append(cosine_sim)
-
-        # Token F1
-        _, _, token_f1 = compute_token_f1(ref, pred)
-        token_f1_list.append(token_f1)
-
-        # Accuracy logic: consider correct if token_f1 ≥ 0.6 (you can adjust threshold)
-        if token_f1 >= 0.6:
-            correct_count += 1
-            
-
-    total = len(ground_truth)
-    accuracy = correct_count / total if total > 0 else 0
-
-    return {
-        "ROUGE-1": round(np.mean(rouge1_list), 4),
-        "ROUGE-L": round(np.mean(rougel_list), 4),
-        "Cosine Similarity": round(np.mean(cosine_list), 4),
-        "F1_Score": round(np.mean(token_f1_list), 4),
-        "Accuracy": round(accuracy, 4)
-    }
+    return evaluate_predictions_detailed(ground_truth, predictions)["aggregate"]
@@ -9,57 +9,190 @@ Functions:
 
 - build_faiss_index(chunks):
     Turns your document chunks into a searchable FAISS index. Think: Ctrl+F, but smarter.
-    Uses HuggingFace's MiniLM embeddings and wraps them with LangChain's FAISS.
+    Embeds everything in one batched MiniLM call (shared model, see embeddings.py) and
+    loads the vectors into an IndexManager, grouped by the file they came from.
+    Repeated or near-identical chunks are embedded once and indexed once (see dedup.py);
+    a retrieved chunk's "filename" lists every file it appeared in.
 
-- get_top_chunks(index, chunk_texts, query, top_k=3):
+- get_top_chunks(index, chunk_texts, query, top_k=5, hybrid=True, filters=None, rerank=None, plan=None,
+                 vector=None):
     Retrieves the top-k most relevant chunks for a query.
-    If a year like "2024" is mentioned in the query, it prioritizes results mentioning that year.
+    Hybrid mode fuses the dense FAISS ranking with a BM25 ranking (reciprocal-rank fusion),
+    boosting exact years and capitalised names on the BM25 side.
+    With reranking on (default: RAG_RERANK, see reranker.py) it over-fetches
+    RAG_RERANK_CANDIDATES candidates and lets the cross-encoder pick the top-k, within a
+    latency budget — over budget, the fused order is used as-is.
+    filters (e.g. {"filename": "flipkart6.xlsx", "type": "xlsx"}) restrict the search before
+    scoring. The query's plan (query_router.py; pass plan= to reuse one) narrows it further:
+    a filename, a month like "October 2007" or a year like "2024" in the question restricts the
+    search to matching chunks — unless none match. A month or year only restricts it when enough
+    chunks mention it to fill top_k; otherwise those chunks are fused into the full ranking.
+    When filters or a filename narrow the set to no more than top_k chunks, nothing is embedded
+    or vector-searched: the chunks are fetched and ordered by BM25.
+    vector= reuses a query embedding the caller already has (e.g. from the answer-cache lookup).
+
+- get_top_chunks_batch(index, queries, k=5, hybrid=True, filters=None, rerank=None, plans=None, vectors=None):
+    Same results as calling get_top_chunks per query, but all queries are embedded in one
+    model call (query embeddings go through embedding_service.py, so concurrent callers share
+    forward passes too), searched with a single matrix index.search and reranked in one cross-encoder pass. Used by the evaluation loop
+    and by `python -m utils.batch_query` for bulk QA runs.
+
+See utils/index_store.py for the on-disk cache that wraps build_faiss_index.
 """
 
-import re
-from sentence_transformers import SentenceTransformer
-import faiss
+from collections import defaultdict
+
 import numpy as np
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
 
+from utils.dedup import embed_unique
+from utils.embedding_service import embed, embed_one
+from utils.index_manager import IndexManager, owners
+from utils.query_router import route_query
+from utils.reranker import RERANK_CANDIDATES, RERANK_ENABLED, rerank_many
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
 
 def build_faiss_index(chunks):
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2", model_kwargs={"device": "cpu"})
+    vectors = embed_unique([chunk["content"] for chunk in chunks])
 
-    documents = []
-    for chunk in chunks:
-        documents.append(
-            Document(
-                page_content=chunk["content"],
-                metadata={"filename": chunk.get("filename", "Unknown")}
-            )
-        )
+    by_file = defaultdict(list)
+    for chunk, vector in zip(chunks, vectors):
+        by_file[chunk.get("filename", "Unknown")].append((chunk, vector))
 
-    db = FAISS.from_documents(documents, embedding=embeddings)
-    return db, documents
+    db = IndexManager()
+    for filename, pairs in by_file.items():
+        db.add_file(filename, [chunk for chunk, _ in pairs], [vector for _, vector in pairs])
+    return db, db.documents
 
 
 
-def get_top_chunks(index, chunk_texts, query, top_k=5):
-    results = index.similarity_search(query, k=3) 
-    year_match = re.search(r"\b(20\d{2})\b", query)
+RRF_K = 60
+CANDIDATES = 20
 
-    if year_match:
-        year = year_match.group(1)
-        filtered = [
-            doc for doc in results if year in doc.page_content
-        ]
-        # Fallback to original if not enough
-        top_docs = filtered[:top_k] if len(filtered) >= top_k else results[:top_k]
-    else:
-        top_docs = results[:top_k]
 
-    return [{
-        "content": doc.page_content,
-        "filename": doc.metadata.get("filename", "Unknown")
-    } for doc in top_docs]
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, vid in enumerate(ranking):
+            scores[vid] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _query_subset(index, plan, filters, top_k):
+    explicit = dict(filters or {})
+    ids = index.select(explicit) if explicit else None
+
+    # Filenames / dates / years in the query narrow the search up front, most specific first;
+    # if no chunk matches a narrowing, try the next one, and finally search without any.
+    # A date or year is only a hint: when too few chunks mention it to fill top-k, those chunks
+    # are preferred (fused into the ranking) instead of being all the search is allowed to see
+    # -> (ids, preferred, exact); exact means ids came from filters / filenames alone, so no chunk
+    # outside them can qualify
+    preferred = None
+    for narrowing in plan["narrowing"]:
+        extra = {field: values for field, values in narrowing.items() if field not in explicit}
+        if not extra:
+            continue
+        narrowed = index.select(dict(explicit, **extra))
+        if not narrowed:
+            continue
+        dated = "dates" in extra or "years" in extra
+        if len(narrowed) >= top_k or not dated:
+            return narrowed, preferred, not dated
+        preferred = preferred or narrowed
+    return ids, preferred, ids is not None
+
+
+def _prefer(index, query, ranked, preferred, hybrid, plan):
+    if not preferred:
+        return ranked
+    return reciprocal_rank_fusion([ranked, _fetch_all(index, query, preferred, hybrid, plan)])
+
+
+def _fuse(index, query, dense_hits, candidates, ids, hybrid, plan):
+    dense = [vid for vid, _ in dense_hits]
+    if not hybrid:
+        return dense
+    sparse = [vid for vid, _ in index.keyword_search(query, candidates, boost_terms=plan["terms"], ids=ids)]
+    return reciprocal_rank_fusion([dense, sparse])
+
 
+def _fetch_all(index, query, ids, hybrid, plan):
+    # An exact (filters / filename) subset fits in top-k anyway: no embedding, no vector search — BM25 (or id) order only
+    ranked = [vid for vid, _ in index.keyword_search(query, len(ids), boost_terms=plan["terms"], ids=ids)] if hybrid else []
+    return ranked + sorted(set(ids) - set(ranked))
+
+
+def _candidates(top_k, rerank):
+    return max(top_k, CANDIDATES, RERANK_CANDIDATES if rerank else 0)
+
+
+def _rerank(index, queries, rankings, top_k):
+    # Cross-encoder picks the top-k out of each query's fused candidates
+    heads = [ranking[:RERANK_CANDIDATES] for ranking in rankings]
+    texts = [[index.docs[vid].page_content for vid in head] for head in heads]
+    reranked = []
+    for ranking, head, order in zip(rankings, heads, rerank_many(queries, texts)):
+        reranked.append(ranking if order is None else [head[i] for i in order][:top_k])
+    return reranked
+
+
+def _as_chunks(index, ranked):
+    chunks = []
+    for vid in ranked:
+        doc = index.docs[vid]
+        chunks.append({"content": doc.page_content, "filename": ", ".join(owners(doc.metadata))})
+    return chunks
+
+
+def get_top_chunks(index, chunk_texts, query, top_k=5, hybrid=True, filters=None, rerank=None, plan=None,
+                   vector=None):
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    plan = plan or route_query(query)
+    ids, preferred, exact = _query_subset(index, plan, filters, top_k)
+    if exact and len(ids) <= top_k:
+        ranked = _fetch_all(index, query, ids, hybrid, plan)
+    else:
+        candidates = _candidates(top_k, rerank)
+        dense_hits = index.search_ids(embed_one(query) if vector is None else vector, candidates, ids=ids)
+        ranked = _fuse(index, query, dense_hits, candidates, ids, hybrid, plan)
+    ranked = _prefer(index, query, ranked, preferred, hybrid, plan)
+    if rerank and len(ranked) > 1:
+        ranked = _rerank(index, [query], [ranked], top_k)[0]
+    return _as_chunks(index, ranked[:top_k])
+
+
+def get_top_chunks_batch(index, queries, k=5, hybrid=True, filters=None, rerank=None, plans=None, vectors=None):
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    plans = plans or [route_query(query) for query in queries]
+    subsets, preferred, exact = zip(*[_query_subset(index, plan, filters, k) for plan in plans]) if plans else ((), (), ())
+    candidates = _candidates(k, rerank)
+
+    # Only queries that need vector search get embedded (in one call); every unfiltered one goes
+    # through one matrix search, filtered ones reuse their vector
+    rankings = [None] * len(queries)
+    searched = []
+    for i, ids in enumerate(subsets):
+        if exact[i] and len(ids) <= k:
+            rankings[i] = _fetch_all(index, queries[i], ids, hybrid, plans[i])
+        else:
+            searched.append(i)
+
+    if searched:
+        if vectors is None:
+            vectors = dict(zip(searched, embed([queries[i] for i in searched])))
+        dense_hits = {}
+        unfiltered = [i for i in searched if subsets[i] is None]
+        if unfiltered:
+            batch = index.search_ids_batch(np.stack([vectors[i] for i in unfiltered]), candidates)
+            dense_hits.update(zip(unfiltered, batch))
+        for i in searched:
+            if subsets[i] is not None:
+                dense_hits[i] = index.search_ids(vectors[i], candidates, ids=subsets[i])
+        for i in searched:
+            rankings[i] = _fuse(index, queries[i], dense_hits[i], candidates, subsets[i], hybrid, plans[i])
+    rankings = [_prefer(index, query, ranked, chunks, hybrid, plan)
+                for query, ranked, chunks, plan in zip(queries, rankings, preferred, plans)]
+
+    if rerank and queries:
+        rankings = _rerank(index, queries, rankings, k)
+    return [_as_chunks(index, ranked[:k]) for ranked in rankings]
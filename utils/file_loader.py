@@ -13,7 +13,8 @@ load_files(files):
     - .txt: Reads plain text like a diary entry
     - .json: Converts to a JSON string (we don't judge)
     - .xml: Parses using ElementTree (XML is weird, we know)
-    - .xlsx: Flattens each row into readable key-value lines
+    - .xlsx: Flattens each row into readable key-value lines, for every sheet
+             (read-only streaming, formatted column-wise; RAG_XLSX_ROWS_PER_CHUNK groups rows)
 
     Returns:
     --------
@@ -26,114 +27,275 @@ load_files(files):
     - Handles encoding errors gracefully.
     - Error messages are preserved in content for transparency.
     - Great for feeding a RAG pipeline or an LLM that loves reading random files.
+
+open_local_files(directory):
+    Wraps every supported file in a directory (e.g. data/) so it looks like an upload.
+    (BytesFile(name, data) does the same for bytes received over HTTP — see server.py.)
+
+iter_documents(files, max_workers=None):
+    The streaming version for ingestion. Parsing is farmed out to a process pool (one task
+    per file, or per batch of pages for PDFs) and documents are yielded as soon as each task
+    finishes — so chunking and embedding can start before the slowest file is parsed.
+    PDFs come out one document per page, with a 'page' number.
+    Workers are spawned rather than forked, so scripts calling it need an
+    `if __name__ == "__main__":` guard.
 """
 
 
-import fitz  
-import pandas as pd
 import json
+import multiprocessing
+import os
 import xml.etree.ElementTree as ET
 import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from io import BytesIO
 
-def load_files(files):
-    all_texts = []
+from utils.tracing import span
 
-    for file in files:
-        filename = file.name
+PDF_PAGES_PER_TASK = 16
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024  # smaller uploads parse faster inline than via a process pool
+XLSX_ROWS_PER_CHUNK = int(os.getenv("RAG_XLSX_ROWS_PER_CHUNK", "1"))
 
-        if filename.endswith(".pdf"):
-            file_bytes = file.read() 
-            try:
-                pdf_stream = BytesIO(file_bytes)
-                doc = fitz.open(stream=pdf_stream, filetype="pdf")
-                text = "\n".join([page.get_text() for page in doc])
-            except Exception as e:
-                text = f"[Error reading PDF: {str(e)}]"
+
+class LocalFile(io.BytesIO):
+    """A file on disk, shaped like a Streamlit upload (.name + bytes) so every loader accepts it."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+class BytesFile(io.BytesIO):
+    """Bytes that arrived some other way (e.g. an HTTP upload), shaped like a Streamlit upload."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def open_local_files(directory):
+    return [
+        LocalFile(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if os.path.splitext(name)[1].lower() in PARSERS
+    ]
+
+
+def read_bytes(file):
+    # Streamlit's UploadedFile has getvalue(); plain file objects need a rewind afterwards
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+def parse_pdf_pages(filename, file_bytes, start=0, stop=None):
+    import fitz
+
+    try:
+        doc = fitz.open(stream=BytesIO(file_bytes), filetype="pdf")
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        return [{
+            "filename": filename,
+            "content": doc[page_no].get_text(),
+            "type": "pdf",
+            "page": page_no + 1
+        } for page_no in range(start, stop)]
+    except Exception as e:
+        return [{
+            "filename": filename,
+            "content": f"[Error reading PDF: {str(e)}]",
+            "type": "pdf"
+        }]
+
+
+def parse_pdf(filename, file_bytes):
+    pages = parse_pdf_pages(filename, file_bytes)
+    return [{
+        "filename": filename,
+        "content": "\n".join(page["content"] for page in pages),
+        "type": "pdf"
+    }]
+
+
+def parse_txt(filename, file_bytes):
+    return [{
+        "filename": filename,
+        "content": file_bytes.decode(),
+        "type": "txt"
+    }]
+
+
+def parse_json(filename, file_bytes):
+    all_texts = []
+    try:
+        data = json.loads(file_bytes)
+        if isinstance(data, list):
+            for item in data:
+                chunk = json.dumps(item, indent=2)
+                all_texts.append({
+                    "filename": filename,
+                    "content": chunk,
+                    "type": "json"
+                })
+        elif isinstance(data, dict):
+            for key, value in data.items():
+                chunk = json.dumps({key: value}, indent=2)
+                all_texts.append({
+                    "filename": filename,
+                    "content": chunk,
+                    "type": "json"
+                })
+        else:
+            content = json.dumps(data, indent=2)
             all_texts.append({
                 "filename": filename,
-                "content": text,
-                "type": "pdf"
+                "content": content,
+                "type": "json"
             })
+    except Exception as e:
+        all_texts.append({
+            "filename": filename,
+            "content": f"[Error parsing JSON: {str(e)}]",
+            "type": "json"
+        })
+    return all_texts
 
 
-        elif filename.endswith(".txt"):
-            content = file.read().decode()
+def parse_xml(filename, file_bytes):
+    all_texts = []
+    try:
+        tree = ET.parse(io.BytesIO(file_bytes))
+        root = tree.getroot()
+        for child in root:
+            content = ET.tostring(child, encoding='unicode')
             all_texts.append({
                 "filename": filename,
                 "content": content,
-                "type": "txt"
+                "type": "xml"
             })
-        
-        elif filename.endswith(".json"):
-            try:
-                data = json.load(file)
-                if isinstance(data, list):
-                    for item in data:
-                        chunk = json.dumps(item, indent=2)
-                        all_texts.append({
-                            "filename": filename,
-                            "content": chunk,
-                            "type": "json"
-                        })
-                elif isinstance(data, dict):
-                    for key, value in data.items():
-                        chunk = json.dumps({key: value}, indent=2)
-                        all_texts.append({
-                            "filename": filename,
-                            "content": chunk,
-                            "type": "json"
-                        })
-                else:
-                    content = json.dumps(data, indent=2)
-                    all_texts.append({
-                        "filename": filename,
-                        "content": content,
-                        "type": "json"
-                    })
-            except Exception as e:
-                all_texts.append({
-                    "filename": filename,
-                    "content": f"[Error parsing JSON: {str(e)}]",
-                    "type": "json"
-                })
+    except Exception as e:
+        all_texts.append({
+            "filename": filename,
+            "content": f"[Error parsing XML: {str(e)}]",
+            "type": "xml"
+        })
+    return all_texts
 
-        elif filename.endswith(".xml"):
-            try:
-                xml_bytes = file.read()
-                tree = ET.parse(io.BytesIO(xml_bytes))
-                root = tree.getroot()
-                for child in root:
-                    content = ET.tostring(child, encoding='unicode')
-                    all_texts.append({
-                        "filename": filename,
-                        "content": content,
-                        "type": "xml"
-                    })
-            except Exception as e:
-                all_texts.append({
-                    "filename": filename,
-                    "content": f"[Error parsing XML: {str(e)}]",
-                    "type": "xml"
-                })
 
-        elif filename.endswith(".xlsx"):
-            try:
-                file.seek(0)
-                df = pd.read_excel(file, engine='openpyxl')
-                for _, row in df.iterrows():
-                    row_text = "\n".join([f"{col.strip()}: {str(row[col]).strip()}" for col in df.columns])
-                    all_texts.append({
-                        "filename": filename,
-                        "content": row_text,
-                        "type": "xlsx"
-                    })
-            except Exception as e:
+def _format_rows(df):
+    # Column-at-a-time string ops instead of iterrows: "Header: value" lines joined per row
+    text = None
+    for position, col in enumerate(df.columns):
+        header = str(col).strip() if col is not None else f"Column {position + 1}"
+        values = df.iloc[:, position].fillna("").astype(str).str.strip()
+        line = header + ": " + values
+        text = line if text is None else text + "\n" + line
+    return text
+
+
+def parse_xlsx(filename, file_bytes, rows_per_chunk=None):
+    import openpyxl
+    import pandas as pd
+
+    rows_per_chunk = rows_per_chunk or XLSX_ROWS_PER_CHUNK
+    all_texts = []
+    try:
+        workbook = openpyxl.load_workbook(BytesIO(file_bytes), read_only=True, data_only=True)
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            df = pd.DataFrame.from_records(rows, columns=header).dropna(how="all")
+            if df.empty:
+                continue
+
+            texts = _format_rows(df).to_numpy()
+            first_rows = df.index.to_numpy() + 2  # 1-based spreadsheet row, after the header
+            for start in range(0, len(texts), rows_per_chunk):
                 all_texts.append({
                     "filename": filename,
-                    "content": f"[Failed to parse Excel file: {filename}] Error: {str(e)}",
-                    "type": "xlsx"
+                    "content": "\n\n".join(texts[start:start + rows_per_chunk]),
+                    "type": "xlsx",
+                    "sheet": sheet.title,
+                    "row": int(first_rows[start])
                 })
+        workbook.close()
+    except Exception as e:
+        all_texts.append({
+            "filename": filename,
+            "content": f"[Failed to parse Excel file: {filename}] Error: {str(e)}",
+            "type": "xlsx"
+        })
+    return all_texts
+
+
+PARSERS = {
+    ".pdf": parse_pdf,
+    ".txt": parse_txt,
+    ".json": parse_json,
+    ".xml": parse_xml,
+    ".xlsx": parse_xlsx,
+}
+
+
+def parse_file(filename, file_bytes):
+    parser = PARSERS.get(os.path.splitext(filename)[1].lower())
+    return parser(filename, file_bytes) if parser else []
+
+
+def load_files(files):
+    all_texts = []
 
+    with span("load_files") as s:
+        total_bytes = 0
+        for file in files:
+            data = read_bytes(file)
+            total_bytes += len(data)
+            all_texts.extend(parse_file(file.name, data))
+        s.set(items=len(all_texts), bytes=total_bytes, files=len(files))
 
     return all_texts
+
+
+def _parse_tasks(filename, file_bytes):
+    # PDFs are split into page ranges so one big PDF doesn't serialise the whole pool
+    if not filename.lower().endswith(".pdf"):
+        return [(parse_file, (filename, file_bytes))]
+    import fitz
+
+    try:
+        page_count = fitz.open(stream=BytesIO(file_bytes), filetype="pdf").page_count
+    except Exception:
+        return [(parse_pdf_pages, (filename, file_bytes))]
+    return [
+        (parse_pdf_pages, (filename, file_bytes, start, start + PDF_PAGES_PER_TASK))
+        for start in range(0, max(page_count, 1), PDF_PAGES_PER_TASK)
+    ]
+
+
+def iter_documents(files, max_workers=None):
+    payloads = [(file.name, read_bytes(file)) for file in files]
+    tasks = [task for filename, data in payloads for task in _parse_tasks(filename, data)]
+
+    if len(tasks) < 2 or sum(len(data) for _, data in payloads) < PARALLEL_MIN_BYTES:
+        for func, args in tasks:
+            yield from func(*args)
+        return
+
+    # spawn, not fork: a forked child would inherit locks held by other threads (e.g. the
+    # warm-up thread mid-import) and could deadlock on them
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(func, *args): args[0] for func, args in tasks}
+        for future in as_completed(futures):
+            try:
+                yield from future.result()
+            except Exception as e:
+                yield {
+                    "filename": futures[future],
+                    "content": f"[Error reading file: {str(e)}]",
+                    "type": os.path.splitext(futures[future])[1].lstrip(".").lower()
+                }
@@ -0,0 +1,34 @@
+"""
+WHO ELSE IS WRITING HERE?
+-------------------------
+
+An advisory lock on a directory, for state that several processes (server workers, Streamlit
+sessions) share on disk: the persisted index and the answer cache.
+
+Functions:
+----------
+- locked(path, exclusive=False): Context manager holding <path>/.lock — exclusive for writers,
+  shared for readers. A no-op where fcntl is unavailable (Windows): single-writer use only.
+"""
+
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def locked(path, exclusive=False):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
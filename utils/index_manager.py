@@ -0,0 +1,620 @@
+"""
+WHAT IS index_manager.py?
+-------------------------
+
+A FAISS index that knows which file owns which vector — so uploading, replacing or removing
+one file only touches that file's chunks instead of rebuilding everything from scratch.
+
+Class:
+------
+- IndexManager:
+    Wraps a faiss.IndexIDMap2, hands out stable int64 vector IDs, and keeps a per-file
+    ownership table (filename -> vector IDs + content key).
+
+    - add_file(filename, chunks, vectors, key): Adds one file's chunks with pre-computed vectors.
+      Chunks that exactly duplicate an indexed one (see dedup.py) are collapsed into the existing
+      vector, which then lists every source file in its "filenames" metadata and every copy's
+      filename/type/page/sheet/row in "sources", so metadata filters still find each copy.
+    - remove_file(filename): Drops that file's ownership; vectors no other file owns are deleted.
+    - replace_file(...): remove_file + add_file, for when a file's content changed.
+    - similarity_search(query, k): Same call shape as LangChain's FAISS, returns Documents,
+      so get_top_chunks works with either.
+    - search_ids(vector, k, ids) / keyword_search(query, k, boost_terms, ids): Dense and BM25
+      rankings as (vector id, score) pairs — the two inputs to hybrid retrieval. The BM25 side
+      is kept alongside the FAISS index and persisted with it. Passing ids (from select)
+      restricts both searches to that subset up front: small subsets are scored exactly,
+      larger ones go through a FAISS IDSelector.
+    - search_ids_batch(vectors, k): One matrix search for many query vectors.
+    - select(filters): Vector ids matching metadata filters (see metadata.py).
+    - version: Hash of the indexed files' content keys — changes whenever the corpus does.
+    - save(path) / load(path, mmap=False): Persist the index, an EmbeddingStore of chunks +
+      vectors (with its BM25, metadata fields and dedup fingerprints), and a small manifest.
+      Loading memory-maps all of it (the FAISS index via IO_FLAG_MMAP_IFC, so its vectors stay on
+      disk too); chunk text is only read when a Document is actually asked for, and the FAISS
+      index is rebuilt from the stored vectors
+      (no re-encoding) if it is missing or a different index type is requested.
+      Saves write new files and then swap the manifest, under an exclusive file lock (loads take
+      it shared), so processes sharing a directory never see or delete each other's half-written
+      files.
+
+- DocumentTable:
+    vector id -> Document mapping backed by an EmbeddingStore, plus whatever was added or
+    removed since it was written.
+
+Index types (RAG_INDEX_TYPE):
+-----------------------------
+All vectors are L2-normalised and searched by inner product (i.e. cosine similarity).
+- flat:  exact brute-force scan. Default; best below ~50k chunks.
+- ivf:   IVF-Flat. Searches RAG_NPROBE of the inverted lists instead of everything.
+- hnsw:  HNSW graph. RAG_EF_SEARCH trades recall for speed. Removals rebuild the graph.
+- ivfpq: OPQ rotation + IVF + product quantisation. Smallest memory footprint, lossy.
+IVF variants need training: the manager stays flat until it holds enough vectors, then
+trains on a sample and migrates automatically. See benchmarks/ann_benchmark.py.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from collections.abc import Mapping
+
+import numpy as np
+
+from utils.bm25 import BM25Index
+from utils.dedup import DuplicateIndex
+from utils.embedding_store import EmbeddingStore
+from utils.embedding_service import embed_one
+from utils.file_lock import locked
+from utils.metadata import MetadataStore
+from utils.tracing import span
+
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
+HNSW_M = 32
+TRAIN_SAMPLE_SIZE = 100_000
+PQ_CENTROIDS = 256  # 8-bit PQ codes
+# faiss's k-means wants ~39 training points per centroid: PQ needs 39 * 256 whatever the nlist
+MIN_TRAIN_POINTS = {"flat": 0, "hnsw": 0, "ivf": 2048, "ivfpq": 39 * PQ_CENTROIDS}
+EXACT_SUBSET_MAX = 4096  # filtered subsets up to this size are scored exactly, cost ∝ subset
+METADATA_KEYS = ("filename", "type", "page", "sheet", "row")
+MANIFEST_FORMAT = 6
+
+
+def _nlist(n):
+    # ~4*sqrt(n) lists, but keep at least ~39 training points per centroid
+    return max(1, min(int(4 * np.sqrt(n)), n // 39, 65536))
+
+
+def _pq_subquantizers(dim):
+    return next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+
+
+def normalize(vectors):
+    import faiss
+    matrix = np.array(vectors, dtype=np.float32, copy=True).reshape(-1, np.shape(vectors)[-1])
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def make_faiss_index(kind, dim, train_vectors=None, seed=0):
+    """Builds an empty (but trained, where needed) inner-product index that accepts add_with_ids."""
+    import faiss
+    metric = faiss.METRIC_INNER_PRODUCT
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    if kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        base.hnsw.efConstruction = 80
+        return faiss.IndexIDMap2(base)
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {INDEX_TYPES}")
+
+    n = len(train_vectors)
+    nlist = _nlist(n)
+    if kind == "ivf":
+        index = faiss.index_factory(dim, f"IVF{nlist},Flat", metric)
+    else:
+        m = _pq_subquantizers(dim)
+        index = faiss.index_factory(dim, f"OPQ{m},IVF{nlist},PQ{m}", metric)
+
+    rng = np.random.default_rng(seed)
+    sample = train_vectors[rng.choice(n, min(n, TRAIN_SAMPLE_SIZE), replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    # Hashtable direct map: IVF keeps our IDs and still supports remove_ids/reconstruct
+    faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+def set_search_params(index, nprobe=NPROBE, ef_search=EF_SEARCH):
+    import faiss
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+    if hasattr(index, "index"):
+        base = faiss.downcast_index(index.index)
+        if hasattr(base, "hnsw"):
+            base.hnsw.efSearch = ef_search
+
+
+def make_document(content, metadata):
+    # langchain takes ~0.5s to import; only pay for it once a Document is actually built
+    from langchain.schema import Document
+
+    return Document(page_content=content, metadata=metadata)
+
+
+def _source(chunk, filename):
+    metadata = {key: chunk[key] for key in METADATA_KEYS if chunk.get(key) is not None}
+    metadata.setdefault("filename", filename)
+    return metadata
+
+
+def owners(metadata):
+    # Files a (possibly deduplicated) chunk came from
+    return list(metadata.get("filenames") or [metadata.get("filename", "Unknown")])
+
+
+class DocumentTable(Mapping):
+    def __init__(self, store=None):
+        self.store = store
+        self.added = {}       # vid -> (Document, vector), not written to a store yet
+        self.removed = set()  # vids still in the store but no longer indexed
+
+    def _row(self, vid):
+        if self.store is None or vid in self.removed:
+            return None
+        return self.store.row_of(vid)
+
+    def __getitem__(self, vid):
+        if vid in self.added:
+            return self.added[vid][0]
+        row = self._row(vid)
+        if row is None:
+            raise KeyError(vid)
+        record = self.store.record(row)
+        return make_document(record["content"], record["metadata"])
+
+    def __contains__(self, vid):
+        return vid in self.added or self._row(vid) is not None
+
+    def __iter__(self):
+        if self.store is not None:
+            for vid in self.store.ids.tolist():
+                if vid not in self.removed:
+                    yield vid
+        yield from self.added
+
+    def __len__(self):
+        stored = len(self.store) if self.store is not None else 0
+        return stored - len(self.removed) + len(self.added)
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed)
+
+    def add(self, vid, document, vector):
+        self.added[vid] = (document, vector)
+
+    def update(self, vid, document):
+        if vid in self.added:
+            self.added[vid] = (document, self.added[vid][1])
+            return
+        # Stored entries are immutable: shadow the row with an in-memory copy
+        vector = self.store.vectors([self._row(vid)])[0]
+        self.removed.add(vid)
+        self.added[vid] = (document, vector)
+
+    def discard(self, vid):
+        if self.added.pop(vid, None) is None and self._row(vid) is not None:
+            self.removed.add(vid)
+
+    def vectors(self, ids):
+        """Original (normalised) vectors for ids — from the store or from pending additions."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.store is not None:
+            dim = self.store.dim
+        else:
+            dim = len(next(iter(self.added.values()))[1]) if self.added else 0
+        matrix = np.empty((len(ids), dim), dtype=np.float32)
+        pending = np.fromiter((vid in self.added for vid in ids.tolist()), dtype=bool, count=len(ids))
+        if (~pending).any():
+            matrix[~pending] = self.store.vectors(np.searchsorted(self.store.ids, ids[~pending]))
+        for i in np.flatnonzero(pending):
+            matrix[i] = self.added[int(ids[i])][1]
+        return matrix
+
+
+class IndexManager:
+    def __init__(self, index_type=INDEX_TYPE):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+        self.index_type = index_type  # what we want
+        self.active_type = None       # what self.index currently is (flat until trainable)
+        self.index = None
+        self.docs = DocumentTable()  # vector id -> Document
+        self.file_ids = {}   # filename -> [vector ids]
+        self.file_keys = {}  # filename -> content key of the indexed version
+        self.next_id = 0
+        self.read_only = False
+        self.bm25 = None     # lexical index over the same vector IDs, rebuilt lazily after changes
+        self._bm25_path = None  # saved BM25 files matching self.docs, read on first keyword search
+        self._store_path = None  # saved metadata fields + dedup fingerprints, read on first use
+        self._metadata = None
+        self._duplicates = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def version(self):
+        # Identifies exactly which file contents are indexed; caches scope their entries by it
+        digest = hashlib.sha256()
+        for filename in sorted(self.file_keys):
+            digest.update(f"{filename}\0{self.file_keys[filename]}\0".encode())
+        return digest.hexdigest()
+
+    @property
+    def documents(self):
+        return [self.docs[i] for i in sorted(self.docs)]
+
+    @property
+    def duplicates(self):
+        # Like metadata: fingerprints of a loaded index are only computed once something is added
+        # Exact duplicates only: near-duplicates differ in text, so each keeps its own document
+        if self._duplicates is None and self._store_path:
+            self._duplicates = self._read_saved(lambda path: DuplicateIndex.load(path, max_distance=0))
+        if self._duplicates is None:
+            self._duplicates = DuplicateIndex(max_distance=0)
+            for vid in sorted(self.docs):
+                self._duplicates.add(vid, self.docs[vid].page_content)
+        return self._duplicates
+
+    @property
+    def metadata(self):
+        # Built on first use, so a memory-mapped load doesn't read every chunk up front
+        if self._metadata is None and self._store_path:
+            self._metadata = self._read_saved(MetadataStore.load)
+        if self._metadata is None:
+            self._metadata = MetadataStore()
+            for vid in self.docs:
+                doc = self.docs[vid]
+                self._metadata.add(vid, doc.metadata, doc.page_content)
+        return self._metadata
+
+    def _read_saved(self, loader):
+        with locked(os.path.dirname(self._store_path)):
+            return loader(self._store_path)
+
+    def _load_saved(self):
+        # Before the first change after a load: pick up the saved metadata / fingerprints so they
+        # are kept in sync from here on, instead of being rebuilt from every record later
+        if self._store_path:
+            self.metadata
+            self.duplicates
+            self._store_path = None
+
+    def _invalidate_keyword_index(self):
+        self.bm25 = None
+        self._bm25_path = None
+
+    def _ensure_index(self, dim):
+        if self.index is None:
+            self.active_type = "flat" if MIN_TRAIN_POINTS[self.index_type] else self.index_type
+            self.index = make_faiss_index(self.active_type, dim)
+            set_search_params(self.index)
+
+    def _all_vectors(self, ids):
+        return self.index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+    def _rebuild(self, kind, ids):
+        vectors = self._all_vectors(ids) if ids else None
+        index = make_faiss_index(kind, self.index.d, vectors)
+        if ids:
+            index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        set_search_params(index)
+        self.index = index
+        self.active_type = kind
+
+    def _index_from_store(self):
+        # Rebuild FAISS from the stored vectors — no re-encoding, any index type
+        store = self.docs.store
+        self.index = None
+        self.active_type = None
+        if store is not None and len(store):
+            self._ensure_index(store.dim)
+            self.index.add_with_ids(normalize(store.vectors()), np.asarray(store.ids, dtype=np.int64))
+            self._maybe_train()
+
+    def _maybe_train(self):
+        # Enough data to train the requested IVF variant? Migrate off the interim flat index.
+        if self.active_type != self.index_type and len(self.docs) >= MIN_TRAIN_POINTS[self.index_type]:
+            self._rebuild(self.index_type, sorted(self.docs))
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Index was loaded memory-mapped; reload with mmap=False to modify it.")
+
+    def _set_document(self, vid, document):
+        self.docs.update(vid, document)
+        if self._metadata is not None:
+            self._metadata.remove(vid)
+            self._metadata.add(vid, document.metadata, document.page_content)
+
+    def add_file(self, filename, chunks, vectors, key=None):
+        """
+        Adds one file's chunks. A chunk that exactly duplicates one already indexed is not added
+        again: the existing vector just gains filename as another owner (and its metadata).
+        """
+        self._check_writable()
+        self._load_saved()
+        if filename in self.file_ids:
+            self.remove_file(filename)
+
+        ids, owned, new_ids, new_vectors = [], set(), [], []
+        if chunks:
+            matrix = normalize(vectors)
+            for chunk, vector in zip(chunks, matrix):
+                fingerprint = self.duplicates.fingerprint(chunk["content"])
+                vid = self.duplicates.find(chunk["content"], fingerprint)
+                if vid is None:
+                    vid = self.next_id
+                    self.next_id += 1
+                    metadata = _source(chunk, filename)
+                    metadata["filenames"] = [filename]
+                    self.docs.add(vid, make_document(chunk["content"], metadata), vector)
+                    self.duplicates.add(vid, chunk["content"], fingerprint)
+                    if self._metadata is not None:
+                        self._metadata.add(vid, metadata, chunk["content"])
+                    new_ids.append(vid)
+                    new_vectors.append(vector)
+                elif vid not in owned:
+                    doc = self.docs[vid]
+                    if filename not in owners(doc.metadata):
+                        sources = doc.metadata.get("sources") or [_source(doc.metadata, owners(doc.metadata)[0])]
+                        metadata = dict(doc.metadata, filenames=owners(doc.metadata) + [filename],
+                                        sources=sources + [_source(chunk, filename)])
+                        self._set_document(vid, make_document(doc.page_content, metadata))
+                if vid not in owned:
+                    owned.add(vid)
+                    ids.append(vid)
+
+        if new_ids:
+            self._ensure_index(len(new_vectors[0]))
+            self.index.add_with_ids(np.asarray(new_vectors), np.asarray(new_ids, dtype=np.int64))
+            self._invalidate_keyword_index()
+            self._maybe_train()
+
+        self.file_ids[filename] = ids
+        self.file_keys[filename] = key
+        return ids
+
+    def remove_file(self, filename):
+        """Drops filename's ownership; vectors still owned by another file stay indexed."""
+        self._check_writable()
+        self._load_saved()
+        ids = self.file_ids.pop(filename, [])
+        self.file_keys.pop(filename, None)
+        dropped = []
+        for vid in ids:
+            doc = self.docs.get(vid)
+            if doc is None:
+                continue
+            remaining = [name for name in owners(doc.metadata) if name != filename]
+            if remaining:
+                sources = [source for source in doc.metadata.get("sources") or () if source["filename"] != filename]
+                if sources:
+                    metadata = {key: value for key, value in doc.metadata.items() if key not in METADATA_KEYS}
+                    metadata.update(sources[0], sources=sources)
+                else:
+                    metadata = dict(doc.metadata, filename=remaining[0])
+                metadata["filenames"] = remaining
+                self._set_document(vid, make_document(doc.page_content, metadata))
+                continue
+            dropped.append(vid)
+            self.docs.discard(vid)
+            if self._metadata is not None:
+                self._metadata.remove(vid)
+            if self._duplicates is not None:
+                self._duplicates.remove(vid)
+
+        if dropped and self.index is not None:
+            if self.active_type == "hnsw":
+                # HNSW graphs can't delete nodes; rebuild from the surviving vectors
+                self._rebuild("hnsw", sorted(self.docs))
+            else:
+                self.index.remove_ids(np.asarray(dropped, dtype=np.int64))
+        if dropped:
+            self._invalidate_keyword_index()
+        return len(dropped)
+
+    def replace_file(self, filename, chunks, vectors, key=None):
+        self.remove_file(filename)
+        return self.add_file(filename, chunks, vectors, key)
+
+    @property
+    def keyword_index(self):
+        if self.bm25 is None and self._bm25_path:
+            with locked(os.path.dirname(self._bm25_path)):
+                self.bm25 = BM25Index.load(self._bm25_path)
+        if self.bm25 is None:
+            ids = sorted(self.docs)
+            self.bm25 = BM25Index().build(ids, [self.docs[i].page_content for i in ids])
+        return self.bm25
+
+    def _search_params(self, selector):
+        import faiss
+        if self.active_type in ("ivf", "ivfpq"):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=NPROBE)
+        if self.active_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=EF_SEARCH)
+        return faiss.SearchParameters(sel=selector)
+
+    def search_ids(self, vector, k=4, ids=None):
+        """Dense top-k as (id, score); `ids` restricts the search to that subset before scoring."""
+        import faiss
+        if self.index is None or not self.docs or (ids is not None and not ids):
+            return []
+        query = normalize(vector)
+
+        if ids is not None and len(ids) <= EXACT_SUBSET_MAX:
+            with span("faiss_search", items=1, k=k, subset=len(ids)):
+                subset = np.fromiter(ids, dtype=np.int64, count=len(ids))
+                scores = self._all_vectors(subset) @ query[0]
+                top = np.argsort(-scores)[:k]
+            return [(int(subset[i]), float(scores[i])) for i in top]
+
+        params = None
+        if ids is not None:
+            params = self._search_params(faiss.IDSelectorBatch(np.fromiter(ids, dtype=np.int64, count=len(ids))))
+        with span("faiss_search", items=1, k=k):
+            distances, found = self.index.search(query, min(k, len(self.docs)), params=params)
+        return [(int(vid), float(dist)) for vid, dist in zip(found[0], distances[0]) if vid != -1]
+
+    def search_ids_batch(self, vectors, k=4):
+        if self.index is None or not self.docs:
+            return [[] for _ in range(len(vectors))]
+        with span("faiss_search", items=len(vectors), k=k):
+            distances, found = self.index.search(normalize(vectors), min(k, len(self.docs)))
+        return [
+            [(int(vid), float(dist)) for vid, dist in zip(row_ids, row_dists) if vid != -1]
+            for row_ids, row_dists in zip(found, distances)
+        ]
+
+    def keyword_search(self, query, k=4, boost_terms=None, ids=None):
+        index = self.keyword_index
+        with span("bm25_search", items=1, k=k):
+            return index.search(query, k, boost_terms=boost_terms, ids=ids)
+
+    def select(self, filters):
+        return self.metadata.select(filters) if filters else None
+
+    def file_documents(self, filename):
+        return [self.docs[vid] for vid in self.file_ids.get(filename, [])]
+
+    def similarity_search_by_vector(self, vector, k=4):
+        return [self.docs[vid] for vid, _ in self.search_ids(vector, k)]
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(embed_one(query), k)
+
+    def save(self, path):
+        with locked(path, exclusive=True):
+            self._save(path)
+
+    def _save(self, path):
+        import faiss
+        # Everything a manifest points to is written under a fresh name first; replacing the
+        # manifest is the commit. Only what the replaced manifest referenced is deleted after,
+        # never other stores in the directory
+        previous = self._read_manifest(path) or {}
+
+        # Chunks + vectors (+ BM25) go to a fresh store directory: the current one may still be memory-mapped
+        store = self.docs.store
+        if store is not None and not self.docs.changed and os.path.dirname(store.path) == os.path.abspath(path):
+            store_name = os.path.basename(store.path)
+        else:
+            store_name = f"store-{uuid.uuid4().hex[:12]}"
+            ids = sorted(self.docs)
+            records = []
+            for vid in ids:
+                doc = self.docs[vid]
+                records.append({"content": doc.page_content, "metadata": doc.metadata})
+            EmbeddingStore.write(os.path.join(path, store_name), ids, self.docs.vectors(ids), records)
+            self.keyword_index.save(os.path.join(path, store_name))
+            self.metadata.save(os.path.join(path, store_name))
+            self.duplicates.save(os.path.join(path, store_name))
+        store_path = os.path.join(path, store_name)
+
+        index_name = None
+        if self.index is not None:
+            index_name = f"index-{uuid.uuid4().hex[:12]}.faiss"
+            faiss.write_index(self.index, os.path.join(path, index_name))
+
+        manifest = {
+            "index_type": self.index_type,
+            "active_type": self.active_type,
+            "metric": "ip",
+            "format": MANIFEST_FORMAT,
+            "next_id": self.next_id,
+            "file_keys": self.file_keys,
+            "file_ids": self.file_ids,
+            "store": store_name,
+            "index": index_name,
+        }
+        manifest_tmp = os.path.join(path, f"manifest.{uuid.uuid4().hex[:12]}.json.tmp")
+        with open(manifest_tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(manifest_tmp, os.path.join(path, "manifest.json"))
+
+        if previous.get("store") not in (None, store_name):
+            shutil.rmtree(os.path.join(path, previous["store"]), ignore_errors=True)
+        if previous.get("index") not in (None, index_name):
+            try:
+                os.remove(os.path.join(path, previous["index"]))
+            except OSError:
+                pass
+        # Drop the in-memory copies: from now on chunks and vectors are read from the new store
+        self.docs = DocumentTable(EmbeddingStore.open(os.path.abspath(store_path)))
+
+    @staticmethod
+    def _read_manifest(path):
+        manifest_path = os.path.join(path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Different metric or layout: treat as absent, files get re-added from cache
+        if manifest.get("metric") != "ip" or manifest.get("format") != MANIFEST_FORMAT:
+            return None
+        return manifest
+
+    @classmethod
+    def read_file_keys(cls, path, index_type=INDEX_TYPE):
+        # Cheap peek at what is indexed, without touching the vectors
+        manifest = cls._read_manifest(path)
+        if manifest is None or manifest["index_type"] != index_type:
+            return None
+        return manifest["file_keys"]
+
+    @classmethod
+    def load(cls, path, mmap=False, index_type=INDEX_TYPE):
+        if not os.path.isdir(path):
+            return cls(index_type)
+        with locked(path):
+            return cls._load(path, mmap, index_type)
+
+    @classmethod
+    def _load(cls, path, mmap, index_type):
+        import faiss
+        manager = cls(index_type)
+        manifest = cls._read_manifest(path)
+        store_path = os.path.abspath(os.path.join(path, manifest["store"])) if manifest else None
+        store = EmbeddingStore.open(store_path) if manifest else None
+        if store is None:
+            return manager
+
+        manager.docs = DocumentTable(store)
+        manager.next_id = manifest["next_id"]
+        manager.file_keys = manifest["file_keys"]
+        manager.file_ids = manifest["file_ids"]
+
+        index_path = os.path.join(path, manifest["index"]) if manifest["index"] else None
+        if manifest["index_type"] == index_type and index_path and os.path.exists(index_path):
+            # MMAP_IFC maps the vectors/codes themselves; plain MMAP still copies them into RAM
+            flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            manager.index = faiss.read_index(index_path, flags)
+            set_search_params(manager.index)
+            manager.active_type = manifest["active_type"]
+        else:
+            manager._index_from_store()
+
+        manager._bm25_path = store_path
+        manager._store_path = store_path
+        manager.read_only = mmap
+        return manager
@@ -0,0 +1,203 @@
+"""
+WHY index_store.py?
+-------------------
+
+On-disk, content-addressed cache for embeddings and FAISS indexes — so a Streamlit rerun
+doesn't re-embed the whole corpus just because someone asked another question.
+
+How it works:
+-------------
+- Every uploaded file gets a key: sha256(file bytes + chunking parameters + embedding model name).
+- Per-file entries are EmbeddingStores (see embedding_store.py): that file's chunks plus their
+  vectors, float16 by default (RAG_VECTOR_DTYPE=int8 for a quarter of float32), memory-mapped.
+- The searchable index is a persisted IndexManager (see index_manager.py), one per upload set
+  (manager/<hash of the set's file keys>), so users with different files don't keep rebuilding
+  a shared one. When the set was indexed before, it is read back memory-mapped and nothing
+  gets embedded.
+- Otherwise the most recently used index is copied and updated: removed files lose their
+  vectors, new or changed files are added — from the per-file cache when possible, embedded
+  only when not. manager/LATEST names the last set used; the RAG_INDEX_SETS (default 8) most
+  recently saved sets are kept.
+- Chunk text repeated across (or within) files is embedded once per process and indexed once,
+  owned by every file it came from (see dedup.py).
+
+Functions:
+----------
+- file_key(filename, data, chunk_params, model_name): Content hash for one file.
+- latest_manager_dir(store_dir=None): Directory of the last upload set indexed, or None.
+- build_cached_index(files, store_dir=None):
+    Drop-in replacement for load_files -> chunk_sections -> build_faiss_index.
+    Returns (index, documents) like build_faiss_index, except documents is the index's lazy
+    vector id -> Document table rather than a list, so nothing is read until it is used.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from utils.chunker import CHUNK_OVERLAP, CHUNK_TOKENS, iter_chunks
+from utils.dedup import embed_unique
+from utils.embedding_store import EmbeddingStore
+from utils.embeddings import EMBEDDING_MODEL
+from utils.file_loader import XLSX_ROWS_PER_CHUNK, iter_documents, read_bytes
+from utils.file_lock import locked
+from utils.index_manager import IndexManager
+from utils.tracing import annotate, traced
+
+
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", ".index_cache")
+
+# Bump the version whenever chunking behaviour changes, so old cache entries are ignored
+CHUNK_PARAMS = {
+    "splitter": "sections+windows",
+    "max_tokens": CHUNK_TOKENS,
+    "overlap": CHUNK_OVERLAP,
+    "pdf_pages": True,
+    "xlsx_rows_per_chunk": XLSX_ROWS_PER_CHUNK,
+    "version": 5,
+}
+EMBED_BATCH_SIZE = 64
+MAX_INDEX_SETS = int(os.getenv("RAG_INDEX_SETS", "8"))
+
+
+def file_key(filename, data, chunk_params=CHUNK_PARAMS, model_name=EMBEDDING_MODEL):
+    digest = hashlib.sha256()
+    digest.update(filename.encode())
+    digest.update(b"\0")
+    digest.update(data)
+    digest.update(json.dumps(chunk_params, sort_keys=True).encode())
+    digest.update(model_name.encode())
+    return digest.hexdigest()
+
+
+def _entry_dir(store_dir, kind, key):
+    return os.path.join(store_dir, kind, key[:2], key)
+
+
+def load_file_entry(store_dir, key):
+    store = EmbeddingStore.open(_entry_dir(store_dir, "files", key))
+    if store is None:
+        return None
+    return store.records(), store.vectors()
+
+
+def save_file_entry(store_dir, key, chunks, vectors):
+    EmbeddingStore.write(_entry_dir(store_dir, "files", key), np.arange(len(chunks)), vectors, chunks)
+
+
+def manager_dir(store_dir, keys):
+    # One persisted index per upload set, so sessions with different files don't rebuild one shared index in turns
+    digest = hashlib.sha256(json.dumps(sorted(keys.items())).encode()).hexdigest()[:16]
+    return os.path.join(store_dir, "manager", digest)
+
+
+def latest_manager_dir(store_dir=None):
+    pointer = os.path.join(store_dir or INDEX_DIR, "manager", "LATEST")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        path = os.path.join(os.path.dirname(pointer), f.read().strip())
+    return path if os.path.isdir(path) else None
+
+
+def _mark_latest(path):
+    pointer = os.path.join(os.path.dirname(path), "LATEST")
+    tmp = f"{pointer}.{uuid.uuid4().hex[:12]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path))
+    os.replace(tmp, pointer)
+
+
+def _prune_index_sets(root, keep):
+    # Least recently saved upload sets go first; the lock waits out anyone still loading one
+    sets = [os.path.join(root, name) for name in os.listdir(root)
+            if os.path.exists(os.path.join(root, name, "manifest.json"))]
+    sets.sort(key=lambda path: os.path.getmtime(os.path.join(path, "manifest.json")), reverse=True)
+    for path in sets[keep:]:
+        with locked(path, exclusive=True):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@traced("ingest_files")
+def ingest_files(files):
+    """
+    Parses, chunks and embeds files, overlapping the three: documents stream out of the parser
+    pool and are embedded in batches while the remaining files are still being parsed.
+    Returns {filename: (chunks, vectors)} with chunks in page order.
+    """
+    per_file = {file.name: ([], []) for file in files}
+    pending = []
+
+    def flush():
+        vectors = embed_unique([chunk["content"] for chunk in pending], batch_size=EMBED_BATCH_SIZE)
+        for chunk, vector in zip(pending, vectors):
+            per_file[chunk["filename"]][0].append(chunk)
+            per_file[chunk["filename"]][1].append(vector)
+        pending.clear()
+
+    for chunk in iter_chunks(iter_documents(files)):
+        pending.append(chunk)
+        if len(pending) >= EMBED_BATCH_SIZE:
+            flush()
+    if pending:
+        flush()
+
+    annotate(
+        files=len(files),
+        items=sum(len(chunks) for chunks, _ in per_file.values()),
+        bytes=sum(len(chunk["content"]) for chunks, _ in per_file.values() for chunk in chunks),
+    )
+    results = {}
+    for filename, (chunks, vectors) in per_file.items():
+        # PDF page batches finish out of order; stable sort keeps section order within a page
+        order = sorted(range(len(chunks)), key=lambda i: chunks[i].get("page", 0))
+        results[filename] = ([chunks[i] for i in order], np.asarray([vectors[i] for i in order], dtype=np.float32))
+    return results
+
+
+@traced("build_index")
+def build_cached_index(files, store_dir=None):
+    store_dir = store_dir or INDEX_DIR
+    payloads = {file.name: file for file in files}
+    keys = {name: file_key(name, read_bytes(file)) for name, file in payloads.items()}
+    path = manager_dir(store_dir, keys)
+
+    # This exact upload set was indexed before: serve the persisted index memory-mapped
+    if IndexManager.read_file_keys(path) == keys:
+        manager = IndexManager.load(path, mmap=True)
+        _mark_latest(path)
+        return manager, manager.docs
+
+    # A new upload set starts from the most recent index, so only the files that differ are touched
+    manager = IndexManager.load(latest_manager_dir(store_dir) or path)
+    for name in list(manager.file_keys):
+        if name not in keys:
+            manager.remove_file(name)
+
+    misses = []
+    for name, key in keys.items():
+        if manager.file_keys.get(name) == key:
+            continue
+        entry = load_file_entry(store_dir, key)
+        if entry is None:
+            misses.append(payloads[name])
+        else:
+            manager.replace_file(name, entry[0], entry[1], key)
+
+    if misses:
+        for name, (chunks, vectors) in ingest_files(misses).items():
+            save_file_entry(store_dir, keys[name], chunks, vectors)
+            manager.replace_file(name, chunks, vectors, keys[name])
+
+    if not len(manager):
+        raise ValueError("No content could be extracted from the uploaded files.")
+
+    manager.save(path)
+    _mark_latest(path)
+    _prune_index_sets(os.path.dirname(path), MAX_INDEX_SETS)
+    return manager, manager.docs
@@ -0,0 +1,152 @@
+"""
+WHAT'S metadata.py FOR?
+-----------------------
+
+Indexed per-chunk metadata, so retrieval can narrow down to "chunks from flipkart6.xlsx" or
+"chunks mentioning 2024" *before* vector search instead of fishing through the top 3 afterwards.
+
+Indexed fields:
+---------------
+- filename, type (pdf/txt/json/xml/xlsx), sheet, page, row: straight from the loader
+  (a deduplicated chunk matches the values of every copy it stands for)
+- years: every 19xx/20xx year mentioned in the chunk
+- dates: "October 2007" / "2024-05-13" style mentions, normalised to YYYY-MM
+  (month names match in any case, except "may", which only counts as "May")
+
+Class:
+------
+- MetadataStore:
+    add(vid, metadata, content) / remove(vid): Keep postings in sync with the vector index.
+    select(filters) -> set of vector ids matching every field (any of the values per field).
+    match_filename(keyword): Filenames whose space-less, lower-cased name contains keyword.
+    save(path) / load(path): Persist the extracted fields as JSON, so a loaded index doesn't
+      re-read every chunk to rebuild them.
+"""
+
+
+import json
+import os
+import re
+from collections import defaultdict
+
+
+INDEXED_FIELDS = ("filename", "type", "sheet", "page", "row", "years", "dates")
+
+YEAR_PATTERN = re.compile(r"\b((?:19|20)\d{2})\b")
+MONTHS = {
+    month: number
+    for number, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",),
+         ("jun", "june"), ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"),
+         ("oct", "october"), ("nov", "november"), ("dec", "december")],
+        start=1,
+    )
+    for month in names
+}
+# "may" is only the month when capitalised: "what may 2024 bring" is not about May 2024
+MONTH_NAMES = "|".join("(?-i:May|MAY)" if month == "may" else month for month in sorted(MONTHS, key=len, reverse=True))
+DATE_PATTERN = re.compile(
+    r"\b(?:(?P<month>" + MONTH_NAMES + r")\.?,?\s+(?P<year>(?:19|20)\d{2})"
+    r"|(?P<iso_year>(?:19|20)\d{2})-(?P<iso_month>0[1-9]|1[0-2])(?:-\d{2})?)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_filename(name):
+    return name.lower().replace(" ", "")
+
+
+def extract_fields(metadata, content):
+    fields = {}
+    for field in ("filename", "type", "sheet", "page", "row"):
+        if metadata.get(field) is not None:
+            fields[field] = {str(metadata[field])}
+    if metadata.get("filenames"):
+        # Deduplicated chunks belong to every file they appeared in
+        fields["filename"] = {str(name) for name in metadata["filenames"]}
+    for source in metadata.get("sources") or ():
+        # ... and keep every copy's type / sheet / page / row, not just the first one's
+        for field in ("filename", "type", "sheet", "page", "row"):
+            if source.get(field) is not None:
+                fields.setdefault(field, set()).add(str(source[field]))
+
+    years = set(YEAR_PATTERN.findall(content))
+    dates = set()
+    for match in DATE_PATTERN.finditer(content):
+        if match.group("month"):
+            dates.add(f"{match.group('year')}-{MONTHS[match.group('month').lower()]:02d}")
+        else:
+            dates.add(f"{match.group('iso_year')}-{match.group('iso_month')}")
+    if years:
+        fields["years"] = years
+    if dates:
+        fields["dates"] = dates
+    return fields
+
+
+class MetadataStore:
+    def __init__(self):
+        self.postings = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self.fields = {}  # vid -> {field: values}, so removal knows which postings to clean
+
+    def __len__(self):
+        return len(self.fields)
+
+    def add(self, vid, metadata, content=""):
+        fields = extract_fields(metadata, content)
+        self.fields[vid] = fields
+        for field, values in fields.items():
+            for value in values:
+                self.postings[field][value].add(vid)
+
+    def remove(self, vid):
+        for field, values in self.fields.pop(vid, {}).items():
+            for value in values:
+                ids = self.postings[field][value]
+                ids.discard(vid)
+                if not ids:
+                    del self.postings[field][value]
+
+    def values(self, field):
+        return list(self.postings[field])
+
+    def select(self, filters):
+        """Ids matching every filter field; each field's value may be a single value or a list (any-of)."""
+        selected = None
+        for field, wanted in filters.items():
+            if field not in self.postings:
+                raise ValueError(f"Cannot filter on {field!r}; indexed fields are {INDEXED_FIELDS}")
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            ids = set().union(*(self.postings[field].get(str(value), set()) for value in wanted))
+            selected = ids if selected is None else selected & ids
+            if not selected:
+                return set()
+        return selected if selected is not None else set(self.fields)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        fields = {str(vid): {field: sorted(values) for field, values in by_field.items()}
+                  for vid, by_field in self.fields.items()}
+        with open(os.path.join(path, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(fields, f)
+
+    @classmethod
+    def load(cls, path):
+        fields_path = os.path.join(path, "metadata.json")
+        if not os.path.exists(fields_path):
+            return None
+        with open(fields_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        store = cls()
+        for vid, by_field in saved.items():
+            vid = int(vid)
+            store.fields[vid] = {field: set(values) for field, values in by_field.items()}
+            for field, values in by_field.items():
+                for value in values:
+                    store.postings[field][value].add(vid)
+        return store
+
+    def match_filename(self, keyword):
+        keyword = normalize_filename(keyword)
+        return [name for name in self.postings["filename"] if keyword in normalize_filename(name)]
@@ -0,0 +1,276 @@
+"""
+THE WHOLE RAG LOOP, NO UI REQUIRED
+----------------------------------
+
+Load -> chunk -> index -> retrieve -> prompt -> generate, as a reusable object. The Streamlit
+app drives it one question at a time; the CLI below drives it over a whole file of questions
+for offline batch jobs and load tests.
+
+Class:
+------
+- RAGPipeline(index_dir=None, top_k=None, use_cache=True):
+    top_k defaults to RAG_RERANK_TOP_K (5) chunks when the cross-encoder reranks them
+    (utils/reranker.py), and to 10 plain retrieval hits when it doesn't.
+    ingest(files) / ingest_directory(path): Build (or reuse) the persisted index.
+    load(): Open the index a previous ingest persisted, memory-mapped.
+    prepare(query): Everything before generation — query routing (utils/query_router.py: whole-file
+        fetch, filtered or full hybrid search), answer cache, retrieval, prompt. Returns a result dict; result["answer"] is already set if nothing needs generating.
+    record_answer(result, answer): Fill in a generated answer (and remember it in the cache).
+        prepare + record_answer let the app stream the answer itself.
+    query(query): prepare + generate + record_answer.
+    prepare_many(queries): prepare() for a batch — one embedding call and one matrix search.
+    query_many(queries, max_concurrency): Batched retrieval, then retriever.generate_many (bounded
+        concurrency, shared rate limiter and retries), answers in order.
+
+Every result carries "timings" in seconds: retrieve, generate and total.
+
+Usage:
+------
+    # index data/, persist it, answer every question concurrently
+    python -m utils.pipeline questions.jsonl --data-dir data/ --out answers.jsonl
+
+    # reuse the index from the last run
+    python -m utils.pipeline questions.jsonl --concurrency 8
+
+    # per-stage timings (see utils/tracing.py): dump them, or scrape them while it runs
+    python -m utils.pipeline questions.jsonl --trace-out trace.json --metrics-port 9464
+"""
+
+
+import argparse
+import json
+import sys
+import time
+
+from prompts.chain_of_thought import cot_prompt
+from utils.answer_cache import get_answer_cache
+from utils.batch_query import read_questions
+from utils.embedding_service import embed, embed_one
+from utils.faiss_handler import get_top_chunks, get_top_chunks_batch
+from utils.file_loader import open_local_files
+from utils.index_manager import IndexManager
+from utils.index_store import INDEX_DIR, build_cached_index, latest_manager_dir
+from utils.query_router import QueryRouter
+from utils.reranker import RERANK_ENABLED, RERANK_TOP_K
+from utils.retriever import MAX_CONCURRENCY, generate_many, generate_response
+from utils.tracing import export_json, span, start_metrics_server
+
+
+FILE_CONTENT_CHARS = 3000
+DEFAULT_TOP_K = RERANK_TOP_K if RERANK_ENABLED else 10
+
+
+def file_prompt(filename, content, query):
+    return f"""Use the following document content to answer the question:
+
+                Content from {filename}:
+                {content[:FILE_CONTENT_CHARS]}
+
+                Question: {query}
+                Answer:"""
+
+
+class RAGPipeline:
+    def __init__(self, index_dir=None, top_k=None, use_cache=True):
+        self.index_dir = index_dir or INDEX_DIR
+        self.top_k = top_k or DEFAULT_TOP_K
+        self.use_cache = use_cache
+        self.index = None
+        self._router = None
+        self._router_version = None
+
+    def ingest(self, files):
+        self.index, _ = build_cached_index(files, self.index_dir)
+        return self.index
+
+    def ingest_directory(self, path):
+        return self.ingest(open_local_files(path))
+
+    def load(self):
+        path = latest_manager_dir(self.index_dir)
+        index = IndexManager.load(path, mmap=True) if path else IndexManager()
+        if not len(index):
+            raise ValueError(f"No index found in {self.index_dir}; ingest some files first.")
+        self.index = index
+        return index
+
+    def _require_index(self):
+        if self.index is None:
+            raise RuntimeError("Nothing ingested yet: call ingest(), ingest_directory() or load() first.")
+        return self.index
+
+    @property
+    def router(self):
+        # Filename aliases are rebuilt only when the indexed corpus changes
+        index = self._require_index()
+        if self._router is None or self._router_version != index.version:
+            self._router = QueryRouter(index.file_ids)
+            self._router_version = index.version
+        return self._router
+
+    def _file_route(self, result):
+        # "what does flipkart6.xlsx say?" — answered from that file, no vector search
+        plan = result["plan"] = self.router.route(result["query"])
+        if plan["route"] not in ("file", "file_missing"):
+            return False
+        result["keyword"] = plan["keyword"]
+        if plan["route"] == "file_missing":
+            result["route"] = "file_missing"
+            result["answer"] = f"No document found matching {plan['keyword']}"
+            return True
+        filename = plan["filenames"][0]
+        result["route"] = "file"
+        result["filename"] = filename
+        result["content"] = "\n\n".join(doc.page_content for doc in self.index.file_documents(filename))
+        result["prompt"] = file_prompt(filename, result["content"], result["query"])
+        return True
+
+    def _cache_route(self, result):
+        if not self.use_cache:
+            return False
+        cached = get_answer_cache().lookup(result["query"], scope=self.index.version, vector=result.get("vector"))
+        if not cached:
+            return False
+        result["route"] = "cache"
+        result["answer"] = cached["answer"]
+        result["chunks"] = cached["chunks"]
+        result["cached_query"] = cached["query"]
+        return True
+
+    def _new_result(self, query):
+        return {"query": query, "route": "search", "plan": None, "answer": None, "chunks": [], "prompt": None,
+                "timings": {"retrieve": 0.0, "generate": 0.0, "total": 0.0}}
+
+    def prepare(self, query, top_k=None):
+        self._require_index()
+        start = time.perf_counter()
+        result = self._new_result(query)
+        with span("retrieve", items=1) as s:
+            searchable = not self._file_route(result)
+            if searchable and self.use_cache:
+                # Embedded once: cache lookup, retrieval and cache store all reuse it
+                result["vector"] = embed_one(query)
+            if searchable and not self._cache_route(result):
+                result["chunks"] = get_top_chunks(self.index, self.index.docs, query, top_k=top_k or self.top_k,
+                                                  plan=result["plan"], vector=result.get("vector"))
+                result["prompt"] = cot_prompt(query, result["chunks"])
+            s.set(route=result["route"])
+        result["timings"]["retrieve"] = time.perf_counter() - start
+        result["timings"]["total"] = result["timings"]["retrieve"]
+        return result
+
+    def record_answer(self, result, answer, generate_seconds=None):
+        result["answer"] = answer
+        if generate_seconds is not None:
+            result["timings"]["generate"] = generate_seconds
+            result["timings"]["total"] = result["timings"]["retrieve"] + generate_seconds
+        if self.use_cache and result["route"] == "search" and not answer.strip().startswith("Error"):
+            get_answer_cache().store(result["query"], answer, result["chunks"], scope=self.index.version,
+                                     vector=result.get("vector"))
+        return result
+
+    def _generate(self, result):
+        start = time.perf_counter()
+        answer = generate_response(result["prompt"])
+        return self.record_answer(result, answer, time.perf_counter() - start)
+
+    def query(self, query, top_k=None):
+        result = self.prepare(query, top_k)
+        if result["answer"] is None:
+            self._generate(result)
+        return result
+
+    def prepare_many(self, queries, top_k=None):
+        """prepare() for many queries at once: one batched embedding + search for all that need it."""
+        self._require_index()
+        results = [self._new_result(query) for query in queries]
+
+        start = time.perf_counter()
+        with span("retrieve", items=len(queries)):
+            searchable = [r for r in results if not self._file_route(r)]
+            if searchable and self.use_cache:
+                for result, vector in zip(searchable, embed([r["query"] for r in searchable])):
+                    result["vector"] = vector
+            pending = [r for r in searchable if not self._cache_route(r)]
+            if pending:
+                retrieved = get_top_chunks_batch(self.index, [r["query"] for r in pending], k=top_k or self.top_k,
+                                                 plans=[r["plan"] for r in pending],
+                                                 vectors=[r["vector"] for r in pending] if self.use_cache else None)
+                for result, chunks in zip(pending, retrieved):
+                    result["chunks"] = chunks
+                    result["prompt"] = cot_prompt(result["query"], chunks)
+        # Retrieval is batched, so each query is charged an even share of it
+        share = (time.perf_counter() - start) / max(len(results), 1)
+        for result in results:
+            result["timings"]["retrieve"] = result["timings"]["total"] = share
+        return results
+
+    def query_many(self, queries, top_k=None, max_concurrency=MAX_CONCURRENCY):
+        """Answers queries in order: one batched retrieval, then up to max_concurrency LLM calls at once."""
+        results = self.prepare_many(queries, top_k)
+        to_generate = [r for r in results if r["answer"] is None]
+        if to_generate:
+            start = time.perf_counter()
+            with span("generate", items=len(to_generate)):
+                answers = generate_many([r["prompt"] for r in to_generate], max_concurrency)
+            # Generation runs concurrently, so like retrieval each query is charged an even share of it
+            share = (time.perf_counter() - start) / len(to_generate)
+            for result, answer in zip(to_generate, answers):
+                self.record_answer(result, answer, share)
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("--data-dir", help="Ingest this directory first (uses the on-disk cache)")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="Index cache directory")
+    parser.add_argument("--field", help="JSON field holding the question")
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Concurrent LLM calls")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions per retrieval batch")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the answer cache")
+    parser.add_argument("--out", help="Output JSONL (default: stdout)")
+    parser.add_argument("--trace-out", help="Write per-stage timings (utils/tracing.py) as JSON here")
+    parser.add_argument("--metrics-port", type=int, help="Serve /metrics and /spans on this port while running")
+    args = parser.parse_args(argv)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    pipeline = RAGPipeline(args.index_dir, top_k=args.k, use_cache=not args.no_cache)
+    start = time.perf_counter()
+    if args.data_dir:
+        pipeline.ingest_directory(args.data_dir)
+    else:
+        try:
+            pipeline.load()
+        except ValueError as e:
+            parser.error(f"{e} Pass --data-dir to build one.")
+    ingest_seconds = time.perf_counter() - start
+
+    records = read_questions(args.questions, args.field)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    start = time.perf_counter()
+    try:
+        for offset in range(0, len(records), args.batch_size):
+            batch = records[offset:offset + args.batch_size]
+            results = pipeline.query_many([question for _, question in batch], max_concurrency=args.concurrency)
+            for (record, _), result in zip(batch, results):
+                result.pop("prompt", None)
+                result.pop("content", None)
+                result.pop("vector", None)
+                out.write(json.dumps(dict(record, **result), ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    if args.trace_out:
+        with open(args.trace_out, "w", encoding="utf-8") as f:
+            f.write(export_json(limit=None))
+    print(f"Ingest/load {ingest_seconds:.2f}s; answered {len(records)} questions in {elapsed:.2f}s "
+          f"({len(records) / elapsed if elapsed else 0:.1f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+WHERE SHOULD THIS QUESTION GO?
+------------------------------
+
+Reads a question once and decides the cheapest way to answer it, before anything gets embedded:
+
+- "what does flipkart6.xlsx say?"        -> file:     fetch that file's chunks directly (no vectors at all)
+- "what does Flipkart say about 2024?"    -> filtered: no single file is named that, so search every
+                                                      flipkart* file (and 2024) instead
+- "revenue in flipkart6.xlsx for 2024"   -> filtered: search only that file / that year / that month
+- "What may 2024 bring?"                 -> filtered: the year only (lowercase "may" is never the month)
+- "Flipkart vs Amazon on logistics"     -> hybrid:   full dense + BM25 search (comparisons never narrow
+                                                      to one date, only to any of the years mentioned)
+
+How it's cheap:
+---------------
+- One precompiled regex with an alternative per intent (file question, date, year, comparison,
+  entity), walked once over the query with finditer — instead of one regex per feature.
+- Filenames are normalised once, when the router is built: an alias dict answers exact names and
+  stems ("flipkart6" -> flipkart6.xlsx) in O(1), and a character trie finds filenames (or stems)
+  mentioned anywhere in the question in one walk.
+- Only a keyword naming exactly one file (full name or stem) takes the file route; a stem shared
+  by several files or a partial name becomes a search filtered to the files it could mean.
+
+Plans are plain dicts (JSON-friendly, they end up in pipeline results):
+    route, keyword, filenames, years, dates, entities, comparison, terms, narrowing
+
+"narrowing" is the list of metadata filters to try, most specific first; retrieval uses the first
+one that matches any chunk (faiss_handler._query_subset), so a year nobody mentions never empties
+the search — and a month or year mentioned by fewer than top-k chunks only boosts them.
+
+Class / functions:
+------------------
+- QueryRouter(filenames=()): route(query) -> plan; lookup(keyword) -> filenames named exactly;
+  matching(keyword) -> filenames containing it.
+- route_query(query): Plan without filename knowledge (what get_top_chunks uses when not given one).
+"""
+
+
+import re
+
+from utils.metadata import DATE_PATTERN, MONTHS, normalize_filename
+
+
+ENTITY_PATTERN = r"[A-Z][\w&.-]*[A-Za-z0-9](?:\s+[A-Z][\w&.-]*[A-Za-z0-9])*"
+QUESTION_WORDS = {"what", "when", "where", "who", "whom", "why", "how", "which", "is", "are", "did", "does", "do", "tell"}
+COMPARISON_WORDS = r"compare[sd]?|comparing|comparison|versus|vs\.?|differences?\s+between|(?:better|worse)\s+than"
+
+QUERY_PATTERN = re.compile(
+    r"(?P<file_question>(?i:\bwhat\s+does\s+(?P<file_keyword>.+?)\s+say))"
+    r"|(?P<date>(?i:" + DATE_PATTERN.pattern + r"))"
+    r"|\b(?P<year_only>(?:19|20)\d{2})\b"
+    r"|(?P<comparison>(?i:\b(?:" + COMPARISON_WORDS + r")(?!\w)))"
+    r"|\b(?P<entity>" + ENTITY_PATTERN + r")"
+)
+TERMINAL = "\0"
+
+
+class QueryRouter:
+    def __init__(self, filenames=()):
+        self.names = list(dict.fromkeys(filenames))
+        self.normalized = [(normalize_filename(name), name) for name in self.names]
+        self.aliases = {}
+        self.trie = {}
+        for normalized, name in self.normalized:
+            stem = normalized.rsplit(".", 1)[0]
+            for alias in {normalized, stem}:
+                self.aliases.setdefault(alias, []).append(name)
+            for mention in {name.lower(), normalized, stem}:
+                self._insert(mention, name)
+
+    def _insert(self, text, name):
+        node = self.trie
+        for char in text:
+            node = node.setdefault(char, {})
+        node.setdefault(TERMINAL, []).append(name)
+
+    def lookup(self, keyword):
+        return list(self.aliases.get(normalize_filename(keyword), ()))
+
+    def matching(self, keyword):
+        # Any filename containing the keyword (space-less, lower-cased)
+        keyword = normalize_filename(keyword)
+        return [name for normalized, name in self.normalized if keyword in normalized]
+
+    def mentions(self, query):
+        """Filenames written out in the query, matched on word boundaries in one trie walk."""
+        text, found = query.lower(), []
+        for start in range(len(text)):
+            if start and text[start - 1].isalnum():
+                continue
+            node, longest = self.trie, ()
+            for end in range(start, len(text)):
+                node = node.get(text[end])
+                if node is None:
+                    break
+                if TERMINAL in node and (end + 1 == len(text) or not text[end + 1].isalnum()):
+                    longest = node[TERMINAL]
+            # "flipkart1.txt" names that file, not every flipkart1.* its stem also matches
+            found.extend(name for name in longest if name not in found)
+        return found
+
+    def route(self, query):
+        plan = {"route": "hybrid", "keyword": None, "filenames": [], "years": [], "dates": [],
+                "entities": [], "comparison": False, "terms": [], "narrowing": []}
+        years, dates = [], []
+        for match in QUERY_PATTERN.finditer(query):
+            kind = match.lastgroup  # the outermost group of the alternative that matched
+            if kind == "file_question":
+                if plan["keyword"] is None:
+                    plan["keyword"] = match.group("file_keyword").strip().replace(" ", "").lower()
+            elif kind == "date":
+                if match.group("month"):
+                    year, month = match.group("year"), MONTHS[match.group("month").lower()]
+                else:
+                    year, month = match.group("iso_year"), int(match.group("iso_month"))
+                years.append(year)
+                dates.append(f"{year}-{month:02d}")
+            elif kind == "year_only":
+                years.append(match.group("year_only"))
+            elif kind == "comparison":
+                plan["comparison"] = True
+            elif kind == "entity":
+                plan["entities"].extend(word for word in match.group("entity").split()
+                                        if word.lower() not in QUESTION_WORDS)
+
+        plan["years"] = list(dict.fromkeys(years))
+        plan["dates"] = list(dict.fromkeys(dates))
+        plan["terms"] = plan["years"] + plan["entities"]
+
+        if plan["keyword"] is not None:
+            named = self.lookup(plan["keyword"])
+            if len(named) == 1:
+                plan["filenames"], plan["route"] = named, "file"
+                return plan
+            plan["filenames"] = named or self.matching(plan["keyword"])
+            if not plan["filenames"]:
+                plan["route"] = "file_missing"
+                return plan
+        else:
+            plan["filenames"] = self.mentions(query) if self.trie else []
+        base = {"filename": plan["filenames"]} if plan["filenames"] else {}
+        if plan["dates"] and not plan["comparison"]:
+            plan["narrowing"].append(dict(base, dates=plan["dates"]))
+        if plan["years"]:
+            plan["narrowing"].append(dict(base, years=plan["years"]))
+        if base:
+            plan["narrowing"].append(base)
+        if plan["narrowing"]:
+            plan["route"] = "filtered"
+        return plan
+
+
+_plain = QueryRouter()
+
+
+def route_query(query):
+    return _plain.route(query)
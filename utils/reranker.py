@@ -0,0 +1,195 @@
+"""
+WHO GETS INTO THE PROMPT?
+-------------------------
+
+A cross-encoder rerank stage. Dense + BM25 retrieval is fast but coarse; a cross-encoder reads
+the query and each candidate together and is far better at picking the best few — so the prompt
+can carry 5 sharp chunks instead of 10 fuzzy ones (shorter prompt, faster LLM call).
+
+How it stays cheap:
+-------------------
+- Retrieval over-fetches RAG_RERANK_CANDIDATES (default 30) candidates; all query/candidate
+  pairs are scored in one batched CPU pass (for batches of queries too).
+- Hard latency budget (RAG_RERANK_BUDGET_MS, default 300): the per-pair cost is tracked (calls
+  that overran still report what they measured), only as many candidates as fit the budget get
+  scored (the rest keep their retrieval order), and each batch is sized to the time left — the
+  very first one is a small probe, since nothing has been measured yet. If the remaining pairs
+  can't fit, the retrieval order is returned unchanged. At least a probe's worth of pairs is
+  always scored, so a one-off slow call can't leave the estimate stuck too high.
+- RAG_RERANK_BACKEND picks the runtime:
+    torch (default) | int8 (torch dynamic int8 quantization of the Linear layers)
+    | onnx (sentence-transformers ONNX backend; needs `pip install optimum[onnxruntime]`,
+      RAG_RERANK_ONNX_FILE selects a pre-quantized file such as onnx/model_qint8_avx512_vnni.onnx)
+- The model is loaded lazily, once per process. If it can't be loaded, reranking switches
+  itself off and retrieval order is used.
+
+Set RAG_RERANK=0 to disable reranking entirely.
+
+Functions:
+----------
+- get_reranker(): The shared CrossEncoder (or None if disabled / unavailable).
+- load_reranker(): Same, but a load error is raised instead of turning reranking off.
+- rerank(query, texts, budget_ms=None): New order of texts (list of indices), or None = keep order.
+- rerank_many(queries, candidate_lists, budget_ms=None): Same for many queries, one model pass.
+- reranker_stats(): Calls, fallbacks, and the current per-pair cost estimate.
+"""
+
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.tracing import span
+
+
+RERANK_ENABLED = os.getenv("RAG_RERANK", "1") != "0"
+RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BACKEND = os.getenv("RAG_RERANK_BACKEND", "torch")
+RERANK_ONNX_FILE = os.getenv("RAG_RERANK_ONNX_FILE")
+RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "30"))
+RERANK_TOP_K = int(os.getenv("RAG_RERANK_TOP_K", "5"))
+RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", "300"))
+RERANK_BATCH_SIZE = 32
+PROBE_PAIRS = 4  # first batch of the process, before the per-pair cost is known
+MIN_RERANKED = 2  # scoring fewer candidates than this isn't worth it
+COST_SMOOTHING = 0.3
+
+_model = None
+_failed = False
+_lock = threading.Lock()
+_stats = {"calls": 0, "fallbacks": 0, "trimmed": 0, "seconds_per_pair": None}
+_stats_lock = threading.Lock()  # request threads rerank concurrently
+
+
+def _load(name, backend):
+    from sentence_transformers import CrossEncoder
+
+    if backend == "onnx":
+        model_kwargs = {"file_name": RERANK_ONNX_FILE} if RERANK_ONNX_FILE else None
+        return CrossEncoder(name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = CrossEncoder(name, device="cpu")
+    if backend == "int8":
+        import torch
+
+        model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def load_reranker():
+    # Raises if the model can't be loaded, without switching reranking off (warm-up uses this)
+    global _model
+    if not RERANK_ENABLED:
+        return None
+    if _model is None:
+        with _lock:
+            if _model is None:
+                start = time.perf_counter()
+                _model = _load(RERANK_MODEL, RERANK_BACKEND)
+                print(f"Loaded reranker {RERANK_MODEL} ({RERANK_BACKEND}) in {time.perf_counter() - start:.2f}s")
+    return _model
+
+
+def get_reranker():
+    global _failed
+    if not RERANK_ENABLED or _failed:
+        return None
+    try:
+        return load_reranker()
+    except Exception as e:
+        _failed = True
+        print(f"Reranker unavailable, using retrieval order: {e}")
+        return None
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, delta in deltas.items():
+            _stats[key] += delta
+
+
+def _record_cost(per_pair):
+    with _stats_lock:
+        previous = _stats["seconds_per_pair"]
+        _stats["seconds_per_pair"] = per_pair if previous is None else (
+            COST_SMOOTHING * per_pair + (1 - COST_SMOOTHING) * previous)
+
+
+def _fit(candidate_lists, budget):
+    # Trim every list to what the budget allows at the last measured per-pair cost
+    cost = _stats["seconds_per_pair"]
+    total = sum(len(texts) for texts in candidate_lists)
+    if cost is None or total * cost <= budget:
+        return candidate_lists
+    limit = int(budget / cost / max(len(candidate_lists), 1))
+    _count(trimmed=1)
+    if limit < MIN_RERANKED:
+        # Nothing fits at the current estimate: still score a small probe, so one slow call
+        # can't switch reranking off for good — the estimate only recovers by measuring again
+        return [texts[:PROBE_PAIRS] if i == 0 else [] for i, texts in enumerate(candidate_lists)]
+    return [texts[:limit] for texts in candidate_lists]
+
+
+def rerank_many(queries, candidate_lists, budget_ms=None):
+    """
+    For each query, the order its candidates should be read in (indices into its list): reranked
+    head first, then any candidates the budget didn't cover in their original order.
+    None for a query means "keep the original order".
+    """
+    model = get_reranker()
+    if model is None or not queries:
+        return [None] * len(queries)
+
+    budget = (budget_ms if budget_ms is not None else RERANK_BUDGET_MS) / 1000 * len(queries)
+    scored_lists = _fit(candidate_lists, budget)
+    pairs = [(query, text) for query, texts in zip(queries, scored_lists) for text in texts]
+    if not pairs:
+        _count(fallbacks=1)
+        return [None] * len(queries)
+
+    _count(calls=1)
+    with span("rerank", items=len(pairs), queries=len(queries)) as s:
+        start = time.perf_counter()
+        deadline = start + budget
+        cost = _stats["seconds_per_pair"]
+        scores = []
+        while len(scores) < len(pairs):
+            # Each batch is only as big as the time left allows at the current per-pair cost
+            left = deadline - time.perf_counter()
+            size = PROBE_PAIRS if cost is None else min(RERANK_BATCH_SIZE, int(left / cost))
+            if not scores:
+                size = max(size, PROBE_PAIRS)  # always measure something
+            if size < 1:
+                # The remaining pairs can't fit: keep retrieval order, but remember what was measured
+                if scores:
+                    _record_cost(cost)
+                _count(fallbacks=1)
+                s.set(fallback=True)
+                return [None] * len(queries)
+            batch = pairs[len(scores):len(scores) + size]
+            scores.extend(np.asarray(model.predict(batch, batch_size=len(batch), show_progress_bar=False)).ravel())
+            cost = (time.perf_counter() - start) / len(scores)
+        _record_cost(cost)
+
+    orders, offset = [], 0
+    for texts, scored in zip(candidate_lists, scored_lists):
+        head = np.asarray(scores[offset:offset + len(scored)])
+        offset += len(scored)
+        if not len(scored):
+            orders.append(None)
+            continue
+        ranked = [int(i) for i in np.argsort(-head, kind="stable")]
+        orders.append(ranked + list(range(len(scored), len(texts))))
+    return orders
+
+
+def rerank(query, texts, budget_ms=None):
+    return rerank_many([query], [texts], budget_ms)[0]
+
+
+def reranker_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    return dict(stats, model=RERANK_MODEL, backend=RERANK_BACKEND, loaded=_model is not None)
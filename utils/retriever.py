@@ -8,29 +8,164 @@ What it does:
 - Loads your `GROQ_API_KEY` securely from environment variables (didn’t hardcode it).
 - Uses the Groq Chat Completion endpoint to send a prompt and get a smart response.
 - Handles JSON decoding and prints useful debug info when the API goes weird.
+- Reuses one pooled HTTP session, retries 429/5xx with exponential backoff, and rate-limits
+  every call through a shared token bucket.
 
 Functions:
 ----------
 - generate_response(prompt: str) -> str:
     Sends a user prompt to the Groq API using gemma2-9b-it.
     Returns the model's response text, or an error string if things break.
+
+- stream_response(prompt: str) -> Iterator[str]:
+    Same request with stream=True; yields answer tokens as Groq's SSE events arrive.
+    Time-to-first-token and total time land in get_call_metrics().
+
+- generate_many(prompts, max_concurrency) -> list[str]:
+    Answers a batch of prompts concurrently (bounded), in prompt order.
+    agenerate_many is the same thing for callers that already run an event loop.
+
+- get_call_metrics(): One record per recent call, streamed or not: latency, status, attempts,
+    streamed, ttft and chunks (ttft/chunks are None for blocking calls).
+
+Set GROQ_API_URL to point at a local mock server for testing.
 """
 
 
+import asyncio
+import json
 import os
+import random
+import threading
+import time
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+
+from utils.tracing import span, start_span
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "gemma2-9b-it"  
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 
-def generate_response(prompt):
+REQUEST_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+REQUESTS_PER_SECOND = float(os.getenv("GROQ_REQUESTS_PER_SECOND", "5"))
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter, shared by every thread that talks to Groq."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_session = None
+_session_lock = threading.Lock()
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND)
+call_metrics = deque(maxlen=1000)
+
+
+def get_session():
+    # One pooled session per process: keeps TLS connections to Groq alive between calls
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(MAX_CONCURRENCY, 10))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt, response=None):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return BACKOFF_BASE * (2 ** attempt) * (1 + random.random() * 0.25)
+
+
+def _new_metrics(streamed=False):
+    return {"latency": None, "status": None, "attempts": 0, "streamed": streamed,
+            "ttft": None, "chunks": 0 if streamed else None}
+
+
+def post_chat_completion(payload, stream=False, metrics=None):
+    """POST to the chat-completions endpoint with rate limiting and exponential backoff on 429/5xx.
+
+    Appends a call record to call_metrics, unless the caller passes its own metrics dict to fill
+    in and record once it is done with the response (streams finish long after this returns).
+    """
+    record = metrics is None
+    metrics = _new_metrics() if record else metrics
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
     }
 
+    start = time.perf_counter()
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.acquire()
+        try:
+            response = get_session().post(GROQ_API_URL, headers=headers, json=payload, timeout=REQUEST_TIMEOUT, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                metrics.update(latency=time.perf_counter() - start, attempts=attempt + 1)
+                if record:
+                    call_metrics.append(metrics)
+                raise
+            time.sleep(_backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            response.close()
+            time.sleep(_backoff_delay(attempt, response))
+            continue
+
+        metrics.update(latency=time.perf_counter() - start, status=response.status_code, attempts=attempt + 1)
+        if record:
+            call_metrics.append(metrics)
+        return response
+
+
+def get_call_metrics():
+    return list(call_metrics)
+
+
+def generate_response(prompt):
+    with span("llm", bytes=len(prompt)) as trace:
+        return _complete(prompt, trace)
+
+
+def _complete(prompt, trace):
     payload = {
         "model": GROQ_MODEL,
         "messages": [
@@ -38,15 +173,16 @@ def generate_response(prompt):
         ]
     }
 
-    response = requests.post(
-        "https://api.groq.com/openai/v1/chat/completions",
-        headers=headers,
-        json=payload
-    )
+    try:
+        response = post_chat_completion(payload)
+    except requests.RequestException as e:
+        print(" Request to Groq API failed:", e)
+        return " Error: Could not reach the Groq API."
 
     # DEBUG logging
     try:
         data = response.json()
+        trace.set(status=response.status_code, prompt_tokens=data.get("usage", {}).get("prompt_tokens"))
         if "choices" not in data:
             print("Unexpected API Response:\n", data)
             return f"Error: Unexpected response from Groq API: {data.get('error', {}).get('message', 'No choices returned.')}"
@@ -56,3 +192,83 @@ def generate_response(prompt):
         print("Status Code:", response.status_code)
         print("Response Text:", response.text)
         return " Error: Could not parse response from Groq API."
+
+
+def stream_response(prompt):
+    """Yields the answer token by token from Groq's SSE stream; records time-to-first-token and total time."""
+    # Ended by hand: a `with` block would stay open across yields into the caller's code
+    trace = start_span("llm_stream", bytes=len(prompt))
+    try:
+        yield from _stream(prompt, trace)
+    finally:
+        trace.end()
+
+
+def _stream(prompt, trace):
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "stream": True
+    }
+
+    start = time.perf_counter()
+    metrics = _new_metrics(streamed=True)
+    try:
+        response = post_chat_completion(payload, stream=True, metrics=metrics)
+    except requests.RequestException as e:
+        call_metrics.append(metrics)
+        print(" Request to Groq API failed:", e)
+        yield " Error: Could not reach the Groq API."
+        return
+
+    if response.status_code != 200:
+        call_metrics.append(metrics)
+        print("Unexpected API Response:\n", response.text)
+        yield f"Error: Unexpected response from Groq API (status {response.status_code})."
+        return
+
+    # SSE is UTF-8 by spec; without a charset header requests would decode it as ISO-8859-1
+    response.encoding = "utf-8"
+    try:
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+                delta = event["choices"][0].get("delta", {}).get("content")
+            except (ValueError, KeyError, IndexError):
+                print(" Skipping malformed stream event:", data)
+                continue
+            usage = event.get("x_groq", {}).get("usage") or event.get("usage")
+            if usage:
+                trace.set(prompt_tokens=usage.get("prompt_tokens"))
+            if delta:
+                if metrics["ttft"] is None:
+                    metrics["ttft"] = time.perf_counter() - start
+                metrics["chunks"] += 1
+                yield delta
+    finally:
+        response.close()
+        metrics["latency"] = time.perf_counter() - start
+        call_metrics.append(metrics)
+        trace.set(ttft=metrics["ttft"], items=metrics["chunks"])
+
+
+async def agenerate_many(prompts, max_concurrency=MAX_CONCURRENCY):
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(prompt):
+        async with semaphore:
+            return await asyncio.to_thread(generate_response, prompt)
+
+    return await asyncio.gather(*(run(prompt) for prompt in prompts))
+
+
+def generate_many(prompts, max_concurrency=MAX_CONCURRENCY):
+    # Answers come back in prompt order; wall time scales with len(prompts) / max_concurrency
+    return asyncio.run(agenerate_many(prompts, max_concurrency))
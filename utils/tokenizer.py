@@ -0,0 +1,55 @@
+"""
+HOW MANY TOKENS IS THAT?
+------------------------
+
+Real tokenizer counts for prompt budgeting, instead of guessing with character slices.
+
+Uses a HuggingFace fast tokenizer (the embedding model's by default; set RAG_TOKENIZER to
+something closer to the LLM if you want tighter numbers). Loaded lazily, once per process.
+
+Functions:
+----------
+- count_tokens(text): Number of tokens in text (no special tokens).
+- token_spans(text): (start, end) character offsets of every token, for cutting on token boundaries.
+- truncate_to_tokens(text, max_tokens): Longest prefix of text that fits in max_tokens.
+"""
+
+
+import os
+import threading
+
+from utils.embeddings import EMBEDDING_MODEL
+
+
+TOKENIZER_MODEL = os.getenv("RAG_TOKENIZER", EMBEDDING_MODEL)
+
+_tokenizer = None
+_lock = threading.Lock()
+
+
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_MODEL, use_fast=True)
+    return _tokenizer
+
+
+def count_tokens(text):
+    return len(get_tokenizer()(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+
+def token_spans(text):
+    return get_tokenizer()(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+
+
+def truncate_to_tokens(text, max_tokens):
+    if max_tokens <= 0:
+        return ""
+    offsets = token_spans(text)
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens - 1][1]]
@@ -0,0 +1,282 @@
+"""
+WHERE DID THE TIME GO?
+----------------------
+
+A tiny in-process tracer, so you can see where a question's time goes without a profiler.
+Each pipeline stage (loading, chunking, embedding, FAISS/BM25 search, prompt building, the Groq
+call) runs inside a span that records:
+
+- wall time (seconds)
+- items (documents, chunks, texts, queries — whatever the stage counts) and bytes
+- prompt_tokens where known (context tokens for cot_prompt, Groq's own count for the LLM call)
+- memory: resident set size when the span ended, and how much it raised the process peak
+
+Spans nest (each knows its parent) and are kept in a bounded in-memory ring; per-stage totals
+and a latency histogram are kept forever. Set RAG_TRACING=0 to turn it all into no-ops.
+
+Functions:
+----------
+- span(name, **attrs): Context manager; `with span("embed", items=len(texts)) as s: ... s.set(bytes=n)`.
+- start_span(name, **attrs): Same, but ended by hand with .end() — for generators, where a
+  context manager would straddle yields.
+- traced(name): Decorator that runs the whole function inside span(name).
+- annotate(**attrs): Add attributes to whatever span is currently open (no-op if none).
+- summary(): Per-stage count, total/mean/p50/p99/max seconds and summed items/bytes/tokens.
+- export_json() / export_prometheus(): The same data for machines.
+- start_metrics_server(port=RAG_METRICS_PORT): Serves /metrics (Prometheus text format) and
+  /spans (JSON) on 127.0.0.1 from a daemon thread. Safe to call on every Streamlit rerun.
+- rss_mb(): Current resident set size in MB.
+"""
+
+
+import contextvars
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+ENABLED = os.getenv("RAG_TRACING", "1") != "0"
+METRICS_PORT = int(os.getenv("RAG_METRICS_PORT", "9464"))
+RECENT_SPANS = 2000
+DURATIONS_PER_STAGE = 1024  # for percentiles
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNTED = ("items", "bytes", "prompt_tokens")
+
+_current = contextvars.ContextVar("rag_span", default=None)
+_lock = threading.Lock()
+_recent = deque(maxlen=RECENT_SPANS)
+_stages = defaultdict(lambda: {
+    "count": 0, "errors": 0, "seconds": 0.0, "max": 0.0,
+    "buckets": [0] * len(LATENCY_BUCKETS),
+    "durations": deque(maxlen=DURATIONS_PER_STAGE),
+    **{key: 0 for key in COUNTED},
+})
+_server = None
+
+
+def rss_mb():
+    # Current resident set size; falls back to peak RSS where /proc isn't available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+class Span:
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.error = False
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._peak_before = peak_rss_mb()
+        self.seconds = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def end(self):
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self._start
+        peak = peak_rss_mb()
+        self.attrs["rss_mb"] = round(rss_mb(), 1)
+        self.attrs["peak_rss_mb"] = round(peak, 1)
+        self.attrs["peak_growth_mb"] = round(peak - self._peak_before, 1)
+        _record(self)
+
+    def as_dict(self):
+        return {"name": self.name, "parent": self.parent, "started": self.started,
+                "seconds": self.seconds, "error": self.error, **self.attrs}
+
+
+class _NoSpan:
+    def set(self, **attrs):
+        return self
+
+    def end(self):
+        pass
+
+
+def _record(record):
+    with _lock:
+        _recent.append(record.as_dict())
+        stage = _stages[record.name]
+        stage["count"] += 1
+        stage["errors"] += record.error
+        stage["seconds"] += record.seconds
+        stage["max"] = max(stage["max"], record.seconds)
+        stage["durations"].append(record.seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if record.seconds <= bound:
+                stage["buckets"][i] += 1
+        for key in COUNTED:
+            value = record.attrs.get(key)
+            if isinstance(value, (int, float)):
+                stage[key] += value
+
+
+def start_span(name, **attrs):
+    if not ENABLED:
+        return _NoSpan()
+    parent = _current.get()
+    return Span(name, parent.name if parent else None, **attrs)
+
+
+@contextmanager
+def span(name, **attrs):
+    record = start_span(name, **attrs)
+    if not ENABLED:
+        yield record
+        return
+    token = _current.set(record)
+    try:
+        yield record
+    except BaseException:
+        record.error = True
+        raise
+    finally:
+        _current.reset(token)
+        record.end()
+
+
+def traced(name):
+    # Decorator form of span, for functions with several return paths
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attrs):
+    record = _current.get()
+    if record is not None:
+        record.set(**attrs)
+
+
+def recent_spans(limit=None):
+    with _lock:
+        spans = list(_recent)
+    return spans[-limit:] if limit else spans
+
+
+def summary():
+    with _lock:
+        stages = {name: dict(stage, durations=list(stage["durations"])) for name, stage in _stages.items()}
+    report = {}
+    for name, stage in sorted(stages.items()):
+        durations = np.asarray(stage["durations"])
+        report[name] = {
+            "count": stage["count"],
+            "errors": stage["errors"],
+            "total_seconds": round(stage["seconds"], 6),
+            "mean_seconds": round(stage["seconds"] / stage["count"], 6) if stage["count"] else 0.0,
+            "p50_seconds": round(float(np.percentile(durations, 50)), 6) if len(durations) else 0.0,
+            "p99_seconds": round(float(np.percentile(durations, 99)), 6) if len(durations) else 0.0,
+            "max_seconds": round(stage["max"], 6),
+            **{key: stage[key] for key in COUNTED},
+        }
+    return report
+
+
+def reset():
+    with _lock:
+        _recent.clear()
+        _stages.clear()
+
+
+def export_json(limit=200):
+    return json.dumps({
+        "summary": summary(),
+        "spans": recent_spans(limit),
+        "process": {"rss_mb": round(rss_mb(), 1), "peak_rss_mb": round(peak_rss_mb(), 1)},
+    })
+
+
+def export_prometheus():
+    with _lock:
+        stages = {name: dict(stage, buckets=list(stage["buckets"])) for name, stage in _stages.items()}
+
+    lines = [
+        "# HELP rag_stage_seconds Wall time per pipeline stage.",
+        "# TYPE rag_stage_seconds histogram",
+    ]
+    for name, stage in sorted(stages.items()):
+        for bound, count in zip(LATENCY_BUCKETS, stage["buckets"]):
+            lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+        lines.append(f'rag_stage_seconds_sum{{stage="{name}"}} {stage["seconds"]}')
+        lines.append(f'rag_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+    for key, help_text in (("errors", "Spans that raised."), ("items", "Items processed."),
+                           ("bytes", "Bytes processed."), ("prompt_tokens", "Prompt tokens.")):
+        lines.append(f"# HELP rag_stage_{key}_total {help_text}")
+        lines.append(f"# TYPE rag_stage_{key}_total counter")
+        for name, stage in sorted(stages.items()):
+            lines.append(f'rag_stage_{key}_total{{stage="{name}"}} {stage[key]}')
+
+    lines += [
+        "# HELP rag_process_rss_megabytes Resident set size.",
+        "# TYPE rag_process_rss_megabytes gauge",
+        f"rag_process_rss_megabytes {rss_mb():.1f}",
+        "# HELP rag_process_peak_rss_megabytes Peak resident set size.",
+        "# TYPE rag_process_peak_rss_megabytes gauge",
+        f"rag_process_peak_rss_megabytes {peak_rss_mb():.1f}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body, content_type = export_prometheus(), "text/plain; version=0.0.4"
+        elif path in ("/spans", "/"):
+            body, content_type = export_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    global _server
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="rag-metrics", daemon=True).start()
+            print(f"Serving pipeline metrics on http://{host}:{port}/metrics and /spans")
+    return _server
@@ -0,0 +1,86 @@
+"""
+WHAT'S LOADING IN THE BACKGROUND?
+---------------------------------
+
+Heavy modules and models load on first use, so the app's first page paints before any of
+them. start_warmup() then uses the time the user spends picking files to pull them in on a
+daemon thread: by the time the first question arrives, they are usually already loaded.
+
+Warmed up, in order (most needed first):
+----------------------------------------
+- file_parsers:     PyMuPDF, openpyxl, pandas (ingesting uploads)
+- documents:        langchain's Document (the index)
+- index:            FAISS and SciPy's sparse matrices (dense and BM25 search)
+- embedding_model:  MiniLM (embeddings.get_model)
+- tokenizer:        prompt budgeting (tokenizer.get_tokenizer)
+- reranker:         the cross-encoder (reranker.load_reranker; skipped when RAG_RERANK=0)
+
+Evaluation dependencies (rouge_score/nltk) are deliberately not warmed: they load only when
+someone runs an evaluation. A step that fails is recorded and left for first use to retry.
+Set RAG_WARMUP=0 to load everything strictly on demand.
+
+Functions:
+----------
+- start_warmup(): Starts the warm-up thread once per process; later calls are no-ops.
+- warmup_status(): step -> seconds it took, "pending", or "error: ...".
+"""
+
+
+import importlib
+import os
+import threading
+import time
+
+from utils.embeddings import get_model
+from utils.reranker import load_reranker
+from utils.tokenizer import get_tokenizer
+from utils.tracing import span
+
+
+ENABLED = os.getenv("RAG_WARMUP", "1") != "0"
+
+
+def _import(*modules):
+    return lambda: [importlib.import_module(module) for module in modules]
+
+
+STEPS = [
+    ("file_parsers", _import("fitz", "openpyxl", "pandas")),
+    ("documents", _import("langchain.schema")),
+    ("index", _import("faiss", "scipy.sparse")),
+    ("embedding_model", get_model),
+    ("tokenizer", get_tokenizer),
+    ("reranker", load_reranker),
+]
+
+_status = {}
+_thread = None
+_lock = threading.Lock()
+
+
+def _run():
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            with span(f"warmup.{name}"):
+                step()
+            _status[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            _status[name] = f"error: {e}"
+            print(f"Warm-up step {name} failed (will load on first use): {e}")
+
+
+def start_warmup():
+    global _thread
+    if not ENABLED:
+        return None
+    with _lock:
+        if _thread is None:
+            _status.update({name: "pending" for name, _ in STEPS})
+            _thread = threading.Thread(target=_run, name="rag-warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def warmup_status():
+    return dict(_status)